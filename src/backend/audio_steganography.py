@@ -1,24 +1,109 @@
 import numpy as np
 import os
-import wave
+import mmap
+import shutil
+import struct
 import json
 import tempfile
 import subprocess
+import threading
 import warnings
-from scipy.fft import dct, idct
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from Crypto.Cipher import AES
 import base64
 
 warnings.filterwarnings("ignore")
 
+# Each MP3 segment is encoded by its own ffmpeg process; the threads only feed its pipes.
+# Created on the first segmented encode, which is opt-in and only used for long tracks.
+_mp3_encode_pool = None
+_mp3_encode_pool_lock = threading.Lock()
+
+
+def _get_mp3_encode_pool() -> ThreadPoolExecutor:
+    global _mp3_encode_pool
+    with _mp3_encode_pool_lock:
+        if _mp3_encode_pool is None:
+            _mp3_encode_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        return _mp3_encode_pool
+
+
 class AudioSteganography:
     """Unified Audio Steganography class supporting MP3, WAV, and other audio formats."""
-    
-    def __init__(self, delta: float = 1000.0, frame_size: int = 2048, coefficient_index: int = 20):
-        """Initialize AudioSteganography with robust parameters for MP3 processing."""
+
+    # Frame bytes examined per step when scanning or copying a WAV
+    WAV_BLOCK_BYTES = 64 * 1024
+    # WAV payloads start with a magic and the UTF-8 length of the message, one bit per
+    # frame byte LSB; files from the old encoder instead end the message with '#'
+    WAV_MAGIC = b'\x00SG'
+    WAV_HEADER = struct.Struct('>3sI')
+    # Frames updated per step when writing QIM coefficients
+    PROJECTION_ROWS = 64
+    # fmt chunk format tags: integer PCM, and WAVE_FORMAT_EXTENSIBLE whose sub-format
+    # GUID then has to be KSDATAFORMAT_SUBTYPE_PCM; float and compressed data are refused
+    WAV_FORMAT_PCM = 0x0001
+    WAV_FORMAT_EXTENSIBLE = 0xFFFE
+    WAV_SUBTYPE_PCM = b'\x01\x00\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+    # Layer III bitrates in kb/s by header index, for MPEG-1 and for MPEG-2/2.5
+    MP3_BITRATES = ((0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+                    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160))
+    # Sample rates by header version bits (MPEG-2.5, reserved, MPEG-2, MPEG-1) and rate index
+    MP3_SAMPLE_RATES = ((11025, 12000, 8000), None, (22050, 24000, 16000), (44100, 48000, 32000))
+    # Bytes after any ID3v2 tag searched for the first MP3 frame
+    MP3_SYNC_SEARCH_BYTES = 64 * 1024
+    # Samples a decoder drops after the encoder delay given in a LAME tag
+    MP3_DECODER_DELAY = 529
+    # MP3 re-encoding is split across CPUs in segments of at least this many MPEG frames.
+    # Each segment is encoded with MP3_SEGMENT_OVERLAP extra frames on either side, which
+    # are dropped, so the encoder has settled by the first and last frames that are kept.
+    MP3_MIN_SEGMENT_FRAMES = 1024
+    MP3_SEGMENT_OVERLAP = 4
+
+    def __init__(self, delta: float = 1000.0, frame_size: int = 2048, coefficient_index: int = 20,
+                 encode_workers: int = 1):
+        """Initialize AudioSteganography with robust parameters for MP3 processing.
+
+        encode_workers above 1 opts in to re-encoding long MP3s as that many parallel
+        segments, which trades the encoder's bit reservoir for wall-clock time.
+        """
         self.delta = delta
+        self.encode_workers = encode_workers
         self.frame_size = frame_size
         self.coefficient_index = coefficient_index
+        self._basis_key = None
+
+    def _coefficient_basis(self) -> np.ndarray:
+        """Orthonormal DCT-II basis vector of coefficient_index for frame_size samples.
+
+        The QIM coefficient of a frame is its dot product with this vector, so
+        it can be read or set without transforming the whole frame.
+        """
+        key = (self.frame_size, self.coefficient_index)
+        if self._basis_key != key:
+            n = np.arange(self.frame_size)
+            scale = np.sqrt((1.0 if self.coefficient_index == 0 else 2.0) / self.frame_size)
+            self._basis = (scale * np.cos(np.pi * self.coefficient_index * (2 * n + 1)
+                                          / (2 * self.frame_size))).astype(np.float32)
+            self._basis_key = key
+        return self._basis
+
+    def _read_coefficients(self, frames: np.ndarray) -> np.ndarray:
+        """The QIM coefficient of each row of frames."""
+        return frames @ self._coefficient_basis()
+
+    def _write_coefficients(self, frames: np.ndarray, targets: np.ndarray) -> None:
+        """Set the QIM coefficient of each row of frames to targets, in place.
+
+        A rank-one update along the basis vector leaves every other DCT
+        coefficient unchanged, exactly like a dct/idct round trip would.
+        """
+        basis = self._coefficient_basis()
+        corrections = (np.asarray(targets, dtype=frames.dtype) - frames @ basis)[:, None]
+        # Row blocks keep the correction temporaries small
+        for start in range(0, len(frames), self.PROJECTION_ROWS):
+            rows = slice(start, start + self.PROJECTION_ROWS)
+            frames[rows] += corrections[rows] * basis
 
     def _encrypt_message(self, message: str, password: str) -> bytes:
         """Encrypt message using AES encryption."""
@@ -33,51 +118,277 @@ class AudioSteganography:
         cipher = AES.new(password.encode('utf-8').ljust(32, b'0'), AES.MODE_EAX, nonce=nonce)
         return cipher.decrypt_and_verify(ciphertext, tag).decode()
 
-    def _load_audio_mp3(self, path: str):
+    def _read_exact(self, stream, size: int) -> bytes:
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError("Unexpected end of audio stream")
+        return data
+
+    def _read_wav_stream_header(self, stream) -> int:
+        """Consume a streamed WAV header up to the start of its samples, returning the sample rate."""
+        riff, _, wave_id = struct.unpack('<4sI4s', self._read_exact(stream, 12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Not a RIFF/WAVE stream")
+        sample_rate = None
+        while True:
+            chunk_id, size = struct.unpack('<4sI', self._read_exact(stream, 8))
+            if chunk_id == b'data':
+                if sample_rate is None:
+                    raise ValueError("WAV stream has no fmt chunk")
+                return sample_rate
+            body = self._read_exact(stream, size + (size & 1))
+            if chunk_id == b'fmt ':
+                sample_rate = struct.unpack_from('<I', body, 4)[0]
+
+    def _read_samples(self, stream, expected: int, limit: int = None) -> np.ndarray:
+        """Read float32 samples from stream straight into a buffer that grows as needed.
+
+        Stops after limit samples when one is given.
         """
-        Load an MP3 into a mono 16-bit PCM numpy array (float32) plus its sample rate.
+        if limit is not None:
+            expected = min(expected, limit)
+        buffer = np.empty(max(expected, 1 << 16), dtype=np.float32)
+        filled = 0
+        wanted = None if limit is None else limit * 4
+        while filled != wanted:
+            if filled == buffer.nbytes:
+                grown = np.empty(len(buffer) * 3 // 2, dtype=np.float32)
+                grown[:len(buffer)] = buffer
+                buffer = grown
+            end = buffer.nbytes if wanted is None else min(buffer.nbytes, wanted)
+            read = stream.readinto(memoryview(buffer).cast('B')[filled:end])
+            if not read:
+                break
+            filled += read
+        return buffer[:filled // 4]
+
+    @contextmanager
+    def _mp3_pcm_stream(self, path: str):
+        """
+        Decode an MP3 with one ffmpeg process, yielding (pipe, sample rate) with the pipe
+        positioned at the mono float32 samples, in [-1, 1].
+
+        ffmpeg is stopped on exit, so callers can read only as much audio as they need.
         """
         with subprocess.Popen(
-            ["ffmpeg", "-y", "-v", "quiet", "-i", path,
-             "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-"],
+            ["ffmpeg", "-y", "-v", "quiet", "-i", path, "-map_metadata", "-1", "-fflags", "+bitexact",
+             "-f", "wav", "-acodec", "pcm_f32le", "-ac", "1", "-"],
             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
         ) as p:
-            chunks = []
-            while True:
-                chunk = p.stdout.read(65536)
-                if not chunk:
-                    break
-                chunks.append(chunk)
-            p.wait()
-        
-        raw_data = b''.join(chunks)
-        audio = np.frombuffer(raw_data, dtype=np.int16).astype(np.float32)
-        
-        probe = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-select_streams", "a:0",
-             "-show_entries", "stream=sample_rate",
-             "-of", "csv=p=0", path],
-            capture_output=True, check=True, text=True
-        )
-        sr = int(probe.stdout.strip())
+            try:
+                yield p.stdout, self._read_wav_stream_header(p.stdout)
+            finally:
+                if p.poll() is None:
+                    p.kill()
+                p.wait()
+
+    def _load_audio_mp3(self, path: str, max_samples: int = None):
+        """
+        Load an MP3 into a mono float32 array on the 16-bit PCM scale, plus its sample rate.
+
+        One ffmpeg process decodes to a WAV stream; the sample rate comes from its
+        header and the samples are read straight into a preallocated buffer. With
+        max_samples, decoding stops once that many samples have arrived.
+        """
+        info = self._mp3_stream_info(path)
+        with self._mp3_pcm_stream(path) as (stream, sr):
+            # Size the buffer from the frame headers, else for a 128 kb/s file; it grows
+            # if the track turns out longer
+            expected = info[0] if info else os.path.getsize(path) * 8 // 128000 * sr
+            audio = self._read_samples(stream, expected, max_samples)
+
+        audio *= 32768
         return audio, sr
 
-    def _save_audio_mp3(self, audio: np.ndarray, sr: int, out_path: str):
+    def _mp3_frame_header(self, header: bytes):
+        """(frame length, samples per frame, sample rate) of a Layer III frame header, or None."""
+        if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+            return None
+        version = header[1] >> 3 & 3
+        bitrate_index = header[2] >> 4
+        rate_index = header[2] >> 2 & 3
+        if version == 1 or header[1] >> 1 & 3 != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+        mpeg1 = version == 3
+        bitrate = self.MP3_BITRATES[not mpeg1][bitrate_index] * 1000
+        sr = self.MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if mpeg1 else 576
+        return samples // 8 * bitrate // sr + (header[2] >> 1 & 1), samples, sr
+
+    def _mp3_frame_spans(self, data: bytes, offset: int = 0) -> list:
+        """(offset, length) of each back-to-back MP3 frame in data, starting at offset."""
+        spans = []
+        while True:
+            header = self._mp3_frame_header(data[offset:offset + 4])
+            if header is None or offset + header[0] > len(data):
+                return spans
+            spans.append((offset, header[0]))
+            offset += header[0]
+
+    def _mp3_stream_info(self, path: str):
         """
-        Take a float32/int16 numpy array (mono), and encode it back to MP3.
+        Decoded length in samples and sample rate of an MP3, read from its frame headers.
+
+        After any ID3v2 tag, the first frame may hold a Xing/Info tag, whose frame count
+        and LAME encoder delay and padding give the length exactly as ffmpeg trims it,
+        or a VBRI tag. Without one, every frame header is walked. No audio is decoded.
+        Returns None when the file does not start with MPEG Layer III frames.
         """
-        with subprocess.Popen(
+        if os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            if data[:3] == b"ID3" and len(data) >= 10:
+                size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+                offset = 10 + size + (10 if data[5] & 0x10 else 0)
+
+            # First sync word whose frame is followed by another frame at the same rate
+            limit = min(offset + self.MP3_SYNC_SEARCH_BYTES, len(data))
+            first = data.find(b"\xff", offset, limit)
+            while first >= 0:
+                header = self._mp3_frame_header(data[first:first + 4])
+                if header is not None:
+                    following = self._mp3_frame_header(data[first + header[0]:first + header[0] + 4])
+                    if following is not None and following[2] == header[2]:
+                        break
+                first = data.find(b"\xff", first + 1, limit)
+            else:
+                return None
+
+            length, samples, sr = header
+            mono = data[first + 3] >> 6 == 3
+            side_info = (17 if mono else 32) if samples == 1152 else (9 if mono else 17)
+            tag = first + 4 + side_info
+            if data[tag:tag + 4] in (b"Xing", b"Info"):
+                flags = int.from_bytes(data[tag + 4:tag + 8], "big")
+                if flags & 1:
+                    frames = int.from_bytes(data[tag + 8:tag + 12], "big")
+                    # The frame count, byte count, seek table and quality fields are
+                    # each present when their flag bit is set; the LAME extension follows
+                    lame = tag + 8 + sum(size for bit, size in enumerate((4, 4, 100, 4)) if flags >> bit & 1)
+                    if data[lame:lame + 4] in (b"LAME", b"Lavf", b"Lavc"):
+                        trim = int.from_bytes(data[lame + 21:lame + 24], "big")
+                        delay, padding = trim >> 12, trim & 0xFFF
+                        return frames * samples - delay - max(padding, self.MP3_DECODER_DELAY), sr
+                    return frames * samples, sr
+                first += length
+            elif data[first + 36:first + 40] == b"VBRI":
+                return int.from_bytes(data[first + 50:first + 54], "big") * samples, sr
+
+            return len(self._mp3_frame_spans(data, first)) * samples, sr
+
+    def _run_mp3_encoder(self, pcm: np.ndarray, sr: int, out_path: str, *options: str) -> bytes:
+        """Encode int16 mono PCM at 256k with one ffmpeg process; out_path '-' returns the MP3."""
+        return subprocess.run(
             ["ffmpeg", "-y", "-v", "quiet",
              "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sr), "-i", "-",
-             "-b:a", "256k", out_path],
-            stdin=subprocess.PIPE, stderr=subprocess.DEVNULL
-        ) as p:
-            audio_bytes = audio.astype(np.int16).tobytes()
-            chunk_size = 65536
-            for i in range(0, len(audio_bytes), chunk_size):
-                p.stdin.write(audio_bytes[i:i+chunk_size])
-            p.stdin.close()
-            p.wait()
+             "-b:a", "256k", *options, out_path],
+            input=pcm.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        ).stdout
+
+    def _patch_info_tag(self, tag: bytearray, frames: int, size: int, samples: int,
+                        frame_samples: int) -> bool:
+        """
+        Rewrite the frame count, byte count and end padding of an ffmpeg/LAME Info tag
+        frame in place, for a stream of frames holding samples samples in size bytes.
+
+        Returns False, leaving tag untouched, unless the frame carries every Xing field
+        followed by a LAME-style extension, the only layout the fixed offsets fit.
+        """
+        xing = max(tag.find(b"Xing"), tag.find(b"Info"))
+        # The flags (frames, bytes, seek table, quality) put the extension 120 bytes on
+        if (xing < 0 or len(tag) < max(xing + 156, 190)
+                or int.from_bytes(tag[xing + 4:xing + 8], "big") != 0x0F
+                or tag[xing + 120:xing + 124] not in (b"LAME", b"Lavc", b"Lavf")):
+            return False
+
+        # The extension keeps the 12-bit encoder delay and end padding 21 bytes in
+        delay = int.from_bytes(tag[xing + 141:xing + 144], "big") >> 12
+        padding = frames * frame_samples - samples - delay
+        struct.pack_into(">II", tag, xing + 8, frames, size)
+        tag[xing + 141:xing + 144] = (delay << 12 | padding).to_bytes(3, "big")
+        # Decoders ignore the delay and padding unless the tag CRC matches: CRC-16
+        # (0x8005, reflected) of the frame's first 190 bytes with the CRC field zeroed
+        tag[xing + 154:xing + 156] = b"\0\0"
+        crc = 0
+        for byte in tag[:190]:
+            crc ^= byte
+            for _ in range(8):
+                crc = crc >> 1 ^ 0xA001 if crc & 1 else crc >> 1
+        struct.pack_into(">H", tag, xing + 154, crc)
+        return True
+
+    def _save_audio_mp3(self, audio: np.ndarray, sr: int, out_path: str, workers: int = None):
+        """
+        Take a float32/int16 numpy array (mono), and encode it back to MP3.
+
+        With more than one worker (by default encode_workers), tracks of at least two
+        segments are cut on MPEG frame boundaries into one segment per worker, encoded
+        by parallel ffmpeg processes without the bit reservoir so every frame stands
+        alone, and spliced frame by frame. The first segment's Info tag is patched with
+        the total frame count and end padding, then ffmpeg remuxes the splice so the
+        tag, and with it gapless playback and the decoder's sample alignment, match a
+        single encode. Short tracks, and splices whose tag can't be patched, are
+        encoded by one ffmpeg process with the bit reservoir.
+        """
+        pcm = audio.astype(np.int16)
+        frame_samples = 1152 if sr >= 32000 else 576
+        frames = len(pcm) // frame_samples
+        segments = min(workers or self.encode_workers, frames // self.MP3_MIN_SEGMENT_FRAMES)
+        if segments < 2:
+            self._run_mp3_encoder(pcm, sr, out_path)
+            return
+
+        bounds = [frames * i // segments * frame_samples for i in range(segments)] + [len(pcm)]
+        overlap = self.MP3_SEGMENT_OVERLAP * frame_samples
+        with tempfile.TemporaryDirectory() as tmp:
+            head_path = os.path.join(tmp, "head.mp3")
+            pool = _get_mp3_encode_pool()
+            jobs = []
+            for i in range(segments):
+                start = max(bounds[i] - overlap, 0)
+                stop = min(bounds[i + 1] + overlap, len(pcm))
+                # Only the first segment keeps the Info tag, which ffmpeg fills in by seeking
+                target, options = (head_path, ()) if i == 0 else ("-", ("-write_xing", "0", "-f", "mp3"))
+                jobs.append(pool.submit(
+                    self._run_mp3_encoder, pcm[start:stop], sr, target,
+                    "-reservoir", "0", "-id3v2_version", "0", *options
+                ))
+
+            parts = []
+            total_frames = 0
+            for i, job in enumerate(jobs):
+                data = job.result()
+                if i == 0:
+                    with open(head_path, "rb") as f:
+                        data = f.read()
+                spans = self._mp3_frame_spans(data)
+                if i == 0:
+                    tag = bytearray(data[:spans.pop(0)[1]])
+                # Segment frame j carries the audio of frame start / frame_samples + j of a
+                # single encode, so drop the overlap and keep the segment's own frames
+                first = (bounds[i] - max(bounds[i] - overlap, 0)) // frame_samples
+                if i + 1 < segments:
+                    spans = spans[first:first + (bounds[i + 1] - bounds[i]) // frame_samples]
+                else:
+                    spans = spans[first:]
+                parts.append(data[spans[0][0]:spans[-1][0] + spans[-1][1]])
+                total_frames += len(spans)
+
+            # The remux below rewrites the seek table and music CRC from the splice
+            if not self._patch_info_tag(tag, total_frames, len(tag) + sum(map(len, parts)),
+                                        len(pcm), frame_samples):
+                self._run_mp3_encoder(pcm, sr, out_path)
+                return
+
+            spliced_path = os.path.join(tmp, "spliced.mp3")
+            with open(spliced_path, "wb") as f:
+                f.write(tag)
+                f.writelines(parts)
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "quiet", "-i", spliced_path, "-c", "copy", out_path],
+                stderr=subprocess.DEVNULL, check=True
+            )
 
     def _encode_bits_vectorized(self, message: str) -> np.ndarray:
         """Convert string to bit array using vectorized operations."""
@@ -130,26 +441,17 @@ class AudioSteganography:
                     "status": False
                 }
             
-            total_samples = num_frames * self.frame_size
-            frames_view = audio[:total_samples].reshape(num_frames, self.frame_size)
             encode_count = len(full_bits)
 
+            # Only the frames carrying bits change, and they change in place
             if encode_count > 0:
-                target_frames = frames_view[:encode_count]
-                dct_coeffs = dct(target_frames, norm='ortho', axis=1)
-                dct_coeffs[:, self.coefficient_index] = np.where(
+                target_frames = audio[:encode_count * self.frame_size].reshape(encode_count, self.frame_size)
+                self._write_coefficients(target_frames, np.where(
                     full_bits.astype(bool), self.delta, -self.delta
-                )
-                frames_view[:encode_count] = idct(dct_coeffs, norm='ortho', axis=1)
+                ))
             
-            modified_audio = np.empty_like(audio)
-            modified_audio[:total_samples] = frames_view.ravel()
-            
-            if total_samples < len(audio):
-                modified_audio[total_samples:] = audio[total_samples:]
-            
-            np.clip(modified_audio, -32768, 32767, out=modified_audio)
-            self._save_audio_mp3(modified_audio, sr, output_file)
+            np.clip(audio, -32768, 32767, out=audio)
+            self._save_audio_mp3(audio, sr, output_file)
             
             return {
                 "stego_text": output_file,
@@ -162,38 +464,37 @@ class AudioSteganography:
             }
 
     def decode_mp3(self, audio_file: str) -> dict:
-        """Decode a hidden message from an MP3 audio file."""
-        try:
-            audio, _ = self._load_audio_mp3(audio_file)
-            num_frames = (len(audio) - self.frame_size + 1) // self.frame_size
-            max_frames_for_len = min(256, num_frames)
+        """Decode a hidden message from an MP3 audio file.
 
-            if max_frames_for_len < 8:
-                 return {"hidden_message": "", "status": False}
-
-            frames_view_len = audio[:max_frames_for_len * self.frame_size].reshape(max_frames_for_len, self.frame_size)
-            dct_coeffs_len = dct(frames_view_len, norm='ortho', axis=1)
-            coeffs_len = dct_coeffs_len[:, self.coefficient_index]
-            bits_len = (coeffs_len > 0).astype(np.uint8)
-            
-            if len(bits_len) < 8:
-                return {"hidden_message": "", "status": False}
-                
-            length = int("".join(map(str, bits_len[:8])), 2)
+        Only the leading audio is decoded: the frames of the 8-bit length header,
+        then the payload frames, after which ffmpeg is stopped.
+        """
+        try:
+            with self._mp3_pcm_stream(audio_file) as (stream, _):
+                header_samples = 8 * self.frame_size
+                audio = self._read_samples(stream, header_samples, header_samples)
+                if len(audio) < header_samples:
+                    return {"hidden_message": "", "status": False}
+
+                audio *= 32768
+                coeffs_len = self._read_coefficients(audio.reshape(8, self.frame_size))
+                bits_len = (coeffs_len > 0).astype(np.uint8)
+                length = int("".join(map(str, bits_len)), 2)
+                    
+                if not (0 < length <= 500):
+                    return {"hidden_message": "", "status": False}
                 
-            if not (0 < length <= 500):
-                return {"hidden_message": "", "status": False}
-            
-            needed_bits = 8 + length * 8
-            if num_frames < needed_bits:
-                return {"hidden_message": "", "status": False}
-
-            frames_view_msg = audio[:needed_bits * self.frame_size].reshape(needed_bits, self.frame_size)
-            dct_coeffs_msg = dct(frames_view_msg, norm='ortho', axis=1)
-            coeffs_msg = dct_coeffs_msg[:, self.coefficient_index]
+                needed_bits = 8 + length * 8
+                payload_samples = (needed_bits - 8) * self.frame_size
+                payload = self._read_samples(stream, payload_samples, payload_samples)
+                if len(payload) < payload_samples:
+                    return {"hidden_message": "", "status": False}
+                payload *= 32768
+
+            frames_view_msg = np.concatenate([audio, payload]).reshape(needed_bits, self.frame_size)
+            coeffs_msg = self._read_coefficients(frames_view_msg)
             bits_msg = (coeffs_msg > 0).astype(np.uint8)
             message = self._decode_bits_vectorized(bits_msg, length)
-            capacity_info = self.get_mp3_capacity(audio_file)
             
             return {
                 "hidden_message": message,
@@ -203,16 +504,17 @@ class AudioSteganography:
             return { "hidden_message": "", "status": False }
 
     def get_mp3_capacity(self, audio_file: str) -> dict:
-        """Check the encoding capacity of an MP3 file."""
+        """Check the encoding capacity of an MP3 file from its frame headers."""
         try:
-            file_size = os.path.getsize(audio_file)
-            estimated_samples = file_size * 5
-            num_frames = estimated_samples // self.frame_size
+            info = self._mp3_stream_info(audio_file)
+            if info is None:
+                # Not plain MPEG frames, so let ffmpeg count the samples
+                audio, _ = self._load_audio_mp3(audio_file)
+                samples = len(audio)
+            else:
+                samples = info[0]
+            num_frames = (samples - self.frame_size + 1) // self.frame_size
 
-            if num_frames < 100:
-                 audio, _ = self._load_audio_mp3(audio_file)
-                 num_frames = (len(audio) - self.frame_size + 1) // self.frame_size
-            
             max_chars = max(0, (num_frames - 8) // 8)
             
             return {
@@ -225,30 +527,92 @@ class AudioSteganography:
                 "status": False
             }
 
+    def _wav_data_chunk(self, path: str):
+        """Locate the sample data of a WAV file from its RIFF chunks.
+
+        Returns (offset, size) of the whole frames in the data chunk; a size
+        field larger than the file (as left by streaming writers) is clamped.
+        Only 8 to 32-bit integer PCM is accepted, as the wave module did: flipping
+        LSBs of float or compressed sample bytes would corrupt the audio.
+        """
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave_id != b'WAVE':
+                raise ValueError("Not a RIFF/WAVE file")
+
+            block_align = data = None
+            while block_align is None or data is None:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError("WAV file has no fmt or data chunk")
+                chunk_id, size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(size)
+                    if len(fmt) < 16:
+                        raise ValueError("WAV fmt chunk is too short")
+                    audio_format, block_align, bits = struct.unpack_from('<H10xHH', fmt)
+                    if audio_format == self.WAV_FORMAT_EXTENSIBLE and fmt[24:40] == self.WAV_SUBTYPE_PCM:
+                        audio_format = self.WAV_FORMAT_PCM
+                    if audio_format != self.WAV_FORMAT_PCM:
+                        raise ValueError(f"Unsupported WAV format 0x{audio_format:04X}; only PCM is supported")
+                    if bits not in (8, 16, 24, 32):
+                        raise ValueError(f"Unsupported WAV sample width of {bits} bits")
+                    f.seek(size & 1, os.SEEK_CUR)
+                    continue
+                if chunk_id == b'data':
+                    data = (f.tell(), min(size, file_size - f.tell()))
+                # Chunks are padded to an even length
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+        offset, size = data
+        return offset, size - size % max(block_align, 1)
+
+    def _map_wav_data(self, path: str, mode: str = 'r', length: int = None) -> np.ndarray:
+        """Memory-map the first length bytes (default all) of a WAV file's sample data."""
+        offset, size = self._wav_data_chunk(path)
+        size = size if length is None else min(size, length)
+        if not size:
+            return np.empty(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode=mode, offset=offset, shape=(size,))
+
+    def _wav_lsb_bytes(self, data: np.ndarray, start: int, count: int) -> bytes:
+        """Up to count message bytes packed from the LSBs of data, starting at message byte start."""
+        bits = data[start * 8:(start + count) * 8] & 1
+        return np.packbits(bits[:len(bits) // 8 * 8]).tobytes()
+
     def encode_wav(self, infile: str, message: str, outfile: str) -> dict:
-        """Encode message in WAV file using LSB."""
+        """Encode message in WAV file using LSB.
+
+        The output is a plain copy of the input with only the frame bytes holding
+        the length-prefixed payload patched in place through a memory map.
+        """
         try:
             capacity_info = self.get_wav_capacity(infile)
-            if not capacity_info["status"] or len(message) > capacity_info["capacity"]:
+            message_bytes = message.encode('utf-8')
+            if not capacity_info["status"] or len(message_bytes) > capacity_info["capacity"]:
                 return {
                     "stego_text": "",
                     "status": False
                 }
 
-            with wave.open(infile, mode='rb') as song:
-                frame_bytes = bytearray(list(song.readframes(song.getnframes())))
-                params = song.getparams()
+            payload = self.WAV_HEADER.pack(self.WAV_MAGIC, len(message_bytes)) + message_bytes
+            bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
 
-            message = message + int((len(frame_bytes) - (len(message) * 8)) / 8) * '#'
-            bits = list(map(int, ''.join([bin(ord(i)).lstrip('0b').rjust(8, '0') for i in message])))
-
-            for i, bit in enumerate(bits):
-                frame_bytes[i] = (frame_bytes[i] & 254) | bit
-            frame_modified = bytes(frame_bytes)
+            # Tiny files may not even hold the header
+            _, size = self._wav_data_chunk(infile)
+            if len(bits) > size:
+                return {
+                    "stego_text": "",
+                    "status": False
+                }
 
-            with wave.open(outfile, 'wb') as fd:
-                fd.setparams(params)
-                fd.writeframes(frame_modified)
+            shutil.copyfile(infile, outfile)
+            target = self._map_wav_data(outfile, mode='r+', length=len(bits))
+            np.bitwise_and(target, 0xFE, out=target)
+            np.bitwise_or(target, bits, out=target)
+            target.flush()
+            del target
             
             return {
                 "stego_text": outfile,
@@ -261,18 +625,49 @@ class AudioSteganography:
             }
 
     def decode_wav(self, file: str) -> dict:
-        """Decode hidden message from WAV file."""
+        """Decode hidden message from WAV file.
+
+        Maps the sample data and unpacks only what the message needs: the length
+        from the header or, for files from the old encoder, blocks up to the
+        first '#' delimiter.
+        """
         try:
-            with wave.open(file, mode='rb') as song:
-                frame_bytes = bytearray(list(song.readframes(song.getnframes())))
-            
-            extracted = [frame_bytes[i] & 1 for i in range(len(frame_bytes))]
-            message = "".join(chr(int("".join(map(str, extracted[i:i+8])), 2)) for i in range(0, len(extracted), 8))
-            decoded = message.split("#")[0]
-            capacity_info = self.get_wav_capacity(file);
-            
+            data = self._map_wav_data(file)
+
+            header = self._wav_lsb_bytes(data, 0, self.WAV_HEADER.size)
+            if len(header) == self.WAV_HEADER.size:
+                magic, length = self.WAV_HEADER.unpack(header)
+                if magic == self.WAV_MAGIC:
+                    if (self.WAV_HEADER.size + length) * 8 > len(data):
+                        return {
+                            "hidden_message": "",
+                            "status": False
+                        }
+                    message = self._wav_lsb_bytes(data, self.WAV_HEADER.size, length)
+                    return {
+                        "hidden_message": message.decode('utf-8', 'replace'),
+                        "status": True
+                    }
+
+            message = bytearray()
+            step = self.WAV_BLOCK_BYTES // 8
+            for start in range(0, len(data) // 8, step):
+                chunk = self._wav_lsb_bytes(data, start, step)
+                end = chunk.find(b'#')
+                if end != -1:
+                    message += chunk[:end]
+                    break
+                message += chunk
+            else:
+                # Leftover bits at the very end form one last, shorter character
+                leftover = (data[len(data) // 8 * 8:] & 1).tolist()
+                if leftover:
+                    value = int(''.join(map(str, leftover)), 2)
+                    if value != ord('#'):
+                        message.append(value)
+
             return {
-                "hidden_message": decoded,
+                "hidden_message": message.decode('latin-1'),
                 "status": True
             }
         except Exception:
@@ -282,20 +677,21 @@ class AudioSteganography:
             }
 
     def get_wav_capacity(self, file: str) -> dict:
-        """Calculate the maximum message capacity for a WAV file."""
+        """Calculate the maximum message capacity (UTF-8 bytes) for a WAV file."""
         try:
-            with wave.open(file, mode='rb') as song:
-                frame_count = song.getnframes()
+            _, frame_bytes = self._wav_data_chunk(file)
             
-            max_chars = frame_count // 8
+            max_chars = max(0, frame_bytes // 8 - self.WAV_HEADER.size)
             
             return {
                 "capacity": max_chars,
+                "unit": "bytes",
                 "status": True
             }
         except Exception:
             return {
                 "capacity": 0,
+                "unit": "bytes",
                 "status": False
             }
 
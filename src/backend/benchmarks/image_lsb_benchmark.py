@@ -0,0 +1,64 @@
+"""Compare the NumPy LSB engine with stegano's lsb.hide/lsb.reveal.
+
+Run from src/backend:  python benchmarks/image_lsb_benchmark.py [--fill 0.05]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+from stegano import lsb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_steganography import ImageSteganography
+
+SIZES_MP = (1, 12, 48)
+
+
+def make_image(megapixels: int) -> Image.Image:
+    width = 4000 if megapixels >= 12 else 1000
+    height = megapixels * 1_000_000 // width
+    rng = np.random.default_rng(megapixels)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), 'RGB')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fill', type=float, default=0.05,
+                        help='fraction of image capacity used by the message')
+    parser.add_argument('--skip-stegano', action='store_true')
+    args = parser.parse_args()
+
+    engine = ImageSteganography()
+    print(f"{'MP':>4} {'chars':>10} {'stegano hide':>13} {'numpy hide':>11} "
+          f"{'stegano reveal':>15} {'numpy reveal':>13} {'speedup':>8}")
+    for mp in SIZES_MP:
+        image = make_image(mp)
+        message = 'x' * int(engine.capacity(image) * args.fill)
+
+        encoded, np_hide = timed(engine.hide, image.copy(), message)
+        revealed, np_reveal = timed(engine.reveal, encoded)
+        assert revealed == message
+
+        if args.skip_stegano:
+            st_hide = st_reveal = float('nan')
+        else:
+            st_encoded, st_hide = timed(lsb.hide, image.copy(), message)
+            assert engine.reveal(st_encoded) == message
+            _, st_reveal = timed(lsb.reveal, st_encoded)
+
+        speedup = (st_hide + st_reveal) / (np_hide + np_reveal)
+        print(f"{mp:>4} {len(message):>10} {st_hide:>12.3f}s {np_hide:>10.3f}s "
+              f"{st_reveal:>14.3f}s {np_reveal:>12.3f}s {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
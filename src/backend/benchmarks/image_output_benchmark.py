@@ -0,0 +1,56 @@
+"""Report encoded output size and encode time for each lossless image output format.
+
+Run from src/backend:  python benchmarks/image_output_benchmark.py [--cover path] [--scale 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from image_steganography import ImageSteganography
+
+DEFAULT_COVER = os.path.join(BACKEND_DIR, '..', '..', 'public', 'image-steganography.jpg')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cover', default=DEFAULT_COVER, help='photo used as the cover image')
+    parser.add_argument('--scale', type=int, default=3, help='upscale factor applied to the cover')
+    args = parser.parse_args()
+
+    cover = Image.open(args.cover).convert('RGB')
+    cover = cover.resize((cover.width * args.scale, cover.height * args.scale), Image.LANCZOS)
+    upload = io.BytesIO()
+    cover.save(upload, format='PNG')
+    upload = upload.getvalue()
+
+    engine = ImageSteganography()
+    message = 'benchmark message ' * 100
+    print(f"cover: {cover.width}x{cover.height}, uploaded PNG {len(upload) / 1e6:.2f} MB")
+    print(f"{'format':>14} {'level':>5} {'bytes out':>12} {'encode':>9}")
+    for output_format, level in (('png', 1), ('png', 6), ('png-optimized', 6), ('webp', 6), ('tiff', 6)):
+        start = time.perf_counter()
+        data, _, ext = engine.encode_file(io.BytesIO(upload), 'png', message,
+                                          compression=level, output_format=output_format)
+        elapsed = time.perf_counter() - start
+        assert engine.decode_file(io.BytesIO(data), ext) == message
+        print(f"{output_format:>14} {level:>5} {len(data):>12,} {elapsed:>8.3f}s")
+        if output_format == 'png' and level == 6:
+            stego = Image.open(io.BytesIO(data))
+            stego.load()
+
+    # Reference: Pillow's default PNG save of the same pixels, which the png writer should match
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    stego.save(buffer, format='PNG')
+    elapsed = time.perf_counter() - start
+    print(f"{'pillow png':>14} {6:>5} {len(buffer.getvalue()):>12,} {elapsed:>8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
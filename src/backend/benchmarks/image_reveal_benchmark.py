@@ -0,0 +1,45 @@
+"""Time revealing a short message from a large PNG: streamed scanlines vs full decode.
+
+Run from src/backend:  python benchmarks/image_reveal_benchmark.py [--megapixels 33]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_steganography import ImageSteganography
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megapixels', type=int, default=33,
+                        help='cover size; 33 MP of noise is roughly a 100 MB PNG')
+    args = parser.parse_args()
+
+    engine = ImageSteganography()
+    width = 6000
+    height = args.megapixels * 1_000_000 // width
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    encoded = engine.hide(Image.fromarray(pixels, 'RGB'), 'short secret message')
+
+    buffer = io.BytesIO()
+    encoded.save(buffer, format='PNG', compress_level=1)
+    data = buffer.getvalue()
+    print(f"PNG size: {len(data) / 1e6:.1f} MB ({width}x{height})")
+
+    for label, source in (("streamed", lambda: io.BytesIO(data)),
+                          ("full decode", lambda: Image.open(io.BytesIO(data)))):
+        start = time.perf_counter()
+        message = engine.reveal(source())
+        elapsed = time.perf_counter() - start
+        assert message == 'short secret message'
+        print(f"{label:>12}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
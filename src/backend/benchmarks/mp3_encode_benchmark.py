@@ -0,0 +1,43 @@
+"""Time the MP3 re-encode in AudioSteganography.encode_mp3 on one ffmpeg process and split across CPUs.
+
+Needs ffmpeg on PATH. Run from src/backend:  python benchmarks/mp3_encode_benchmark.py [--seconds 240]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_steganography import AudioSteganography
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=int, default=240,
+                        help='length of the 44.1 kHz mono track')
+    args = parser.parse_args()
+
+    engine = AudioSteganography()
+    sr = 44100
+    t = np.arange(args.seconds * sr) / sr
+    noise = np.random.default_rng(0).normal(0, 600, len(t))
+    audio = (8000 * np.sin(2 * np.pi * 440 * t) + noise).astype(np.float32)
+    cpus = os.cpu_count() or 1
+    print(f"{args.seconds} s of audio, {cpus} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, count in (("one process", 1), ("segmented", cpus)):
+            out = os.path.join(tmp, f'{count}.mp3')
+            start = time.perf_counter()
+            engine._save_audio_mp3(audio, sr, out, workers=count)
+            elapsed = time.perf_counter() - start
+            decoded, _ = engine._load_audio_mp3(out)
+            assert len(decoded) == len(audio)
+            print(f"{label:>12}: {elapsed:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
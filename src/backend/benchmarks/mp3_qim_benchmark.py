@@ -0,0 +1,69 @@
+"""Time the single-coefficient QIM projection against full scipy DCT/IDCT frames.
+
+Works on synthetic PCM, so no ffmpeg is needed.
+Run from src/backend:  python benchmarks/mp3_qim_benchmark.py [--frames 4008]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.fft import dct, idct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_steganography import AudioSteganography
+
+
+def scipy_write(engine, frames, targets):
+    """The original encode step: full forward and inverse transform of every frame."""
+    coeffs = dct(frames, norm='ortho', axis=1)
+    coeffs[:, engine.coefficient_index] = targets
+    frames[:] = idct(coeffs, norm='ortho', axis=1)
+
+
+def scipy_read(engine, frames):
+    """The original decode step: full forward transform, keeping one coefficient."""
+    return dct(frames, norm='ortho', axis=1)[:, engine.coefficient_index]
+
+
+def best_time(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=8 + 500 * 8,
+                        help='frames carrying bits; the default is a full 500-character message')
+    args = parser.parse_args()
+
+    engine = AudioSteganography()
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 3000, (args.frames, engine.frame_size)).astype(np.float32)
+    targets = np.where(rng.integers(0, 2, args.frames).astype(bool), engine.delta, -engine.delta)
+    print(f"{args.frames} frames of {engine.frame_size} samples")
+
+    by_scipy, by_projection = audio.copy(), audio.copy()
+    scipy_write(engine, by_scipy, targets)
+    engine._write_coefficients(by_projection, targets)
+    print(f"max sample difference: {np.abs(by_scipy - by_projection).max():.4f}")
+    assert np.array_equal(scipy_read(engine, by_projection) > 0, targets > 0)
+    assert np.array_equal(engine._read_coefficients(by_projection) > 0, targets > 0)
+
+    timings = [
+        ("encode, scipy dct/idct", lambda: scipy_write(engine, audio.copy(), targets)),
+        ("encode, projection", lambda: engine._write_coefficients(audio.copy(), targets)),
+        ("decode, scipy dct", lambda: scipy_read(engine, by_projection)),
+        ("decode, projection", lambda: engine._read_coefficients(by_projection)),
+    ]
+    for label, func in timings:
+        print(f"{label:>22}: {best_time(func) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Time TextSteganography.txt_encode against the original encoder on large covers.
+
+Run from src/backend:  python benchmarks/text_encode_benchmark.py [--megabytes 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_steganography import TextSteganography
+
+
+def legacy_txt_encode(self, text, cover_text):
+    """The original line-by-line encoder, kept here as the reference for output and timing."""
+    l = len(text)
+    i = 0
+    add = ''
+    while i < l:
+        t = ord(text[i])
+        if(t >= 32 and t <= 64):
+            t1 = t + 48
+            t2 = t1 ^ 170       # 170: 10101010
+            res = bin(t2)[2:].zfill(8)
+            add += "0011" + res
+        else:
+            t1 = t - 48
+            t2 = t1 ^ 170
+            res = bin(t2)[2:].zfill(8)
+            add += "0110" + res
+        i += 1
+
+    res1 = add + "111111111111"
+
+    # Split cover text into words while preserving structure
+    words = []
+    lines = cover_text.split('\n')
+    for line in lines: 
+        words += line.split()
+
+    # Create word-to-position mapping to preserve formatting
+    word_positions = []
+    word_index = 0
+    result_lines = []
+
+    for line_idx, line in enumerate(lines):
+        line_words = line.split()
+        if not line_words:  # Empty line
+            result_lines.append("")
+            continue
+
+        line_result = []
+        spaces_before = []
+
+        # Find original spacing
+        remaining_line = line
+        for word in line_words:
+            word_pos = remaining_line.find(word)
+            spaces_before.append(remaining_line[:word_pos])
+            remaining_line = remaining_line[word_pos + len(word):]
+        spaces_before.append(remaining_line)  # Trailing spaces
+
+        # Process each word in the line
+        for word_pos, word in enumerate(line_words):
+            # Add the hidden data to words if available
+            s1 = word
+            if word_index < len(words):
+                # Calculate if this word should have hidden data
+                bit_index = word_index * 12
+                if bit_index < len(res1):
+                    j = 0
+                    HM_SK = ""
+                    while(j < 12):
+                        if bit_index + j + 1 < len(res1):
+                            x = res1[bit_index + j] + res1[bit_index + j + 1]
+                            HM_SK += self.ZWC[x]
+                        j += 2
+                    s1 = word + HM_SK
+
+            # Add word with original spacing
+            line_result.append(spaces_before[word_pos] + s1)
+            word_index += 1
+
+        # Add trailing spaces/content
+        line_result.append(spaces_before[-1])
+        result_lines.append(''.join(line_result))
+
+    return '\n'.join(result_lines)
+
+
+def make_cover(megabytes: int) -> str:
+    rng = random.Random(0)
+    vocabulary = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+    lines, size = [], 0
+    while size < megabytes * 1_000_000:
+        line = "  ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 400)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabytes', type=int, default=10)
+    parser.add_argument('--fill', type=float, default=0.5,
+                        help='message length as a fraction of the cover word count')
+    args = parser.parse_args()
+
+    steg = TextSteganography()
+    cover = make_cover(args.megabytes)
+    word_count = len(cover.split())
+    rng = random.Random(1)
+    message = ''.join(chr(rng.randint(32, 126)) for _ in range(int(word_count * args.fill)))
+    print(f"cover: {len(cover) / 1e6:.1f} MB, {word_count:,} words; message: {len(message):,} chars")
+
+    start = time.perf_counter()
+    expected = legacy_txt_encode(steg, message, cover)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = steg.txt_encode(message, cover)
+    new_time = time.perf_counter() - start
+
+    assert result == expected
+    print(f"original: {legacy_time:.2f}s  table/join: {new_time:.2f}s  speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Time AudioSteganography.encode_wav against the original encoder for a short message.
+
+Run from src/backend:  python benchmarks/wav_encode_benchmark.py [--seconds 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_steganography import AudioSteganography
+
+
+def legacy_encode_wav(infile, message, outfile):
+    """The original encoder: '#'-padded to the whole file, one Python bit write per frame byte."""
+    with wave.open(infile, mode='rb') as song:
+        frame_bytes = bytearray(list(song.readframes(song.getnframes())))
+        params = song.getparams()
+
+    message = message + int((len(frame_bytes) - (len(message) * 8)) / 8) * '#'
+    bits = list(map(int, ''.join([bin(ord(i)).lstrip('0b').rjust(8, '0') for i in message])))
+
+    for i, bit in enumerate(bits):
+        frame_bytes[i] = (frame_bytes[i] & 254) | bit
+    frame_modified = bytes(frame_bytes)
+
+    with wave.open(outfile, 'wb') as fd:
+        fd.setparams(params)
+        fd.writeframes(frame_modified)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=int, default=10,
+                        help='length of the 44.1 kHz 16-bit stereo cover')
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='only time the new encoder (the old one is very slow on long covers)')
+    args = parser.parse_args()
+
+    engine = AudioSteganography()
+    message = 'short secret message'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cover = os.path.join(tmp, 'cover.wav')
+        samples = np.random.default_rng(0).integers(-2000, 2000, (args.seconds * 44100, 2), dtype=np.int16)
+        with wave.open(cover, 'wb') as fd:
+            fd.setnchannels(2)
+            fd.setsampwidth(2)
+            fd.setframerate(44100)
+            fd.writeframes(samples.tobytes())
+        print(f"WAV size: {os.path.getsize(cover) / 1e6:.1f} MB ({args.seconds} s)")
+
+        runs = [("encode_wav", lambda out: engine.encode_wav(cover, message, out))]
+        if not args.skip_legacy:
+            runs.append(("legacy", lambda out: legacy_encode_wav(cover, message, out)))
+
+        for label, encode in runs:
+            out = os.path.join(tmp, f'{label}.wav')
+            start = time.perf_counter()
+            encode(out)
+            elapsed = time.perf_counter() - start
+            assert engine.decode_wav(out)["hidden_message"] == message
+            print(f"{label:>12}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
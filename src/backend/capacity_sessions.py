@@ -0,0 +1,197 @@
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+WORD_RE = re.compile(r'\S+')
+
+# Session text is held in blocks of about this many characters, so an edit
+# only rebuilds the few blocks around it instead of copying the whole text.
+BLOCK_CHARS = 4096
+
+
+def _to_blocks(text: str) -> list[str]:
+    return [text[i:i + BLOCK_CHARS] for i in range(0, len(text), BLOCK_CHARS)]
+
+
+def _utf16_length(text: str) -> int:
+    return len(text.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def _code_point_index(text: str, units: int) -> int:
+    """Index into text of the position units UTF-16 code units in."""
+    prefix = text.encode('utf-16-le', 'surrogatepass')[:units * 2].decode('utf-16-le', 'surrogatepass')
+    index = len(prefix)
+    # Cutting a pair leaves half of it at the end of prefix, where text has the whole character
+    if index and prefix[-1] != text[index - 1]:
+        raise ValueError(f"Offset {units} falls inside a surrogate pair.")
+    return index
+
+
+class CapacitySession:
+    """Cover text being edited, with its word count kept up to date edit by edit.
+
+    Edit offsets and lengths count UTF-16 code units, like the string indices
+    browser clients send, so a character outside the BMP (an emoji) counts as two.
+    """
+
+    def __init__(self, text: str, mode: str = 'classic', strip: dict | None = None):
+        self.mode = mode
+        # Characters that don't count towards a word, as a str.translate table; dense mode
+        # passes its alphabet so an already encoded cover counts like check-capacity does
+        self._strip = strip
+        self._blocks = _to_blocks(text)
+        # UTF-16 length of each block, and of the whole text
+        self._units = [_utf16_length(block) for block in self._blocks]
+        self.length = sum(self._units)
+        self.word_count = self._count_words(text)
+        # A block index and the offset it starts at, kept where the last edit landed so
+        # nearby edits find their blocks without summing every block before them
+        self._cursor = (0, 0)
+        self.touched = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._blocks)
+
+    def apply_edits(self, edits) -> None:
+        """Apply (offset, deleted, inserted) edits in order, each against the text the
+        previous one left; if any edit is invalid, none of them are applied.
+        """
+        with self._lock:
+            undo = []
+            try:
+                for offset, deleted, inserted in edits:
+                    undo.append(self._apply_edit(offset, deleted, inserted))
+            except ValueError:
+                for first, count, blocks, units, state in reversed(undo):
+                    self._blocks[first:first + count] = blocks
+                    self._units[first:first + count] = units
+                    self.length, self.word_count, self._cursor = state
+                raise
+
+    def apply_edit(self, offset: int, deleted: int, inserted: str) -> None:
+        """Replace deleted code units at offset with inserted.
+
+        Only the words touching the edit are recounted: the span is widened to the
+        surrounding whitespace, so the words inside it are exactly the ones whose
+        count can change.
+        """
+        self.apply_edits([(offset, deleted, inserted)])
+
+    def _count_words(self, text: str, start: int = 0, stop: int | None = None) -> int:
+        if self._strip is None:
+            return len(WORD_RE.findall(text, start, len(text) if stop is None else stop))
+        # Stripping never joins words, but can empty one made only of stripped characters
+        return len(text[start:stop].translate(self._strip).split())
+
+    def _block_at(self, offset: int) -> tuple[int, int]:
+        """(index, start) of the block holding offset, walking from the cursor; offsets
+        before the text map to the first block and past it to the last."""
+        index, start = self._cursor
+        units = self._units
+        while index > 0 and offset < start:
+            index -= 1
+            start -= units[index]
+        while index < len(units) - 1 and offset >= start + units[index]:
+            start += units[index]
+            index += 1
+        self._cursor = (index, start)
+        return index, start
+
+    def _apply_edit(self, offset: int, deleted: int, inserted: str):
+        end = offset + deleted
+        if offset < 0 or deleted < 0 or end > self.length:
+            raise ValueError(f"Edit {offset}+{deleted} is outside the text (length {self.length}).")
+        blocks = self._blocks
+        state = (self.length, self.word_count, self._cursor)
+        if not blocks:
+            self._blocks[:] = _to_blocks(inserted)
+            self._units[:] = [_utf16_length(block) for block in self._blocks]
+            self.length = sum(self._units)
+            self.word_count = self._count_words(inserted)
+            return 0, len(self._blocks), [], [], state
+
+        # Blocks holding the character before the edit through the one after it,
+        # widened until the words at both ends are complete
+        first, base = self._block_at(offset - 1)
+        last, _ = self._block_at(end)
+        local = ''.join(blocks[first:last + 1])
+        start = _code_point_index(local, offset - base)
+        stop = _code_point_index(local, end - base)
+        while True:
+            while start > 0 and not local[start - 1].isspace():
+                start -= 1
+            while stop < len(local) and not local[stop].isspace():
+                stop += 1
+            if start == 0 and first > 0:
+                first -= 1
+                base -= self._units[first]
+                start, stop = len(blocks[first]) + start, len(blocks[first]) + stop
+                local = blocks[first] + local
+            elif stop == len(local) and last < len(blocks) - 1:
+                last += 1
+                local += blocks[last]
+            else:
+                break
+
+        edit_start = _code_point_index(local, offset - base)
+        edit_stop = _code_point_index(local, end - base)
+        edited = local[:edit_start] + inserted + local[edit_stop:]
+        before = self._count_words(local, start, stop)
+        after = self._count_words(edited, start, stop + len(inserted) - (edit_stop - edit_start))
+
+        new_blocks = _to_blocks(edited)
+        undo = (first, len(new_blocks), blocks[first:last + 1], self._units[first:last + 1], state)
+        blocks[first:last + 1] = new_blocks
+        self._units[first:last + 1] = [_utf16_length(block) for block in new_blocks]
+        self.length += _utf16_length(inserted) - deleted
+        self.word_count += after - before
+        # Blocks before first are untouched, so its start is still base
+        self._cursor = (first, base) if first < len(blocks) else (0, 0)
+        return undo
+
+
+class CapacitySessionStore:
+    """Thread-safe LRU of capacity sessions that expire after ttl seconds without use."""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 30 * 60):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.touched < self.ttl:
+                break
+            del self._sessions[session_id]
+
+    def open(self, text: str, mode: str = 'classic', strip: dict | None = None) -> tuple[str, CapacitySession]:
+        session = CapacitySession(text, mode, strip)
+        session_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._expire(session.touched)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id, session
+
+    def get(self, session_id: str):
+        """The live session for session_id, marked as just used, or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.touched = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+    # Request threads call the parallel kernels concurrently, which aborts the process
+    # under the workqueue layer Numba falls back to without TBB or OpenMP.
+    config.THREADING_LAYER = 'threadsafe'
+except ImportError:
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+    prange = range
+
+# Whether a thread-safe threading layer loaded, found out on the first parallel call.
+_parallel_available = None
+_parallel_lock = threading.Lock()
+
+# Below this many pixels the thread start-up costs more than the NumPy path.
+PARALLEL_MIN_PIXELS = 65536
+
+
+@njit(parallel=True, cache=True, nogil=True)
+def _embed_kernel(target, keep, values):
+    for i in prange(target.shape[0]):
+        for j in range(target.shape[1]):
+            target[i, j] = (target[i, j] & keep[i, j]) | values[i, j]
+
+
+@njit(parallel=True, cache=True, nogil=True)
+def _extract_kernel(pixels, indices, bits_per_channel, out):
+    columns = indices.shape[0]
+    for i in prange(pixels.shape[0]):
+        for c in range(columns):
+            value = pixels[i, indices[c]]
+            base = (i * columns + c) * bits_per_channel
+            for b in range(bits_per_channel):
+                out[base + b] = (value >> (bits_per_channel - 1 - b)) & 1
+
+
+@njit(cache=True, nogil=True)
+def _unfilter_average_kernel(row, prev, bpp):
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+    return row
+
+
+@njit(cache=True, nogil=True)
+def _unfilter_paeth_kernel(row, prev, bpp):
+    for i in range(len(row)):
+        if i >= bpp:
+            a, c = row[i - bpp], prev[i - bpp]
+        else:
+            a = c = 0
+        b = prev[i]
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        if pa <= pb and pa <= pc:
+            predictor = a
+        elif pb <= pc:
+            predictor = b
+        else:
+            predictor = c
+        row[i] = (row[i] + predictor) & 0xFF
+    return row
+
+
+def _unfilter(kernel, row: bytes, prev: np.ndarray, bpp: int) -> np.ndarray:
+    if NUMBA_AVAILABLE:
+        # Widened so the predictor sums can't wrap before the final & 0xFF
+        out = np.frombuffer(row, dtype=np.uint8).astype(np.int32)
+        return kernel(out, prev.astype(np.int32), bpp).astype(np.uint8)
+    # Plain Python is much faster on bytearrays than on NumPy scalars
+    return np.frombuffer(kernel(bytearray(row), prev.tobytes(), bpp), dtype=np.uint8)
+
+
+def unfilter_average(row: bytes, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Reverse the PNG Average filter of one scanline."""
+    return _unfilter(_unfilter_average_kernel, row, prev, bpp)
+
+
+def unfilter_paeth(row: bytes, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Reverse the PNG Paeth filter of one scanline."""
+    return _unfilter(_unfilter_paeth_kernel, row, prev, bpp)
+
+
+def _use_parallel(pixel_count: int) -> bool:
+    """Whether to run the parallel kernels on pixel_count pixels.
+
+    The first call loads the threading layer; if no thread-safe one is installed
+    the NumPy paths are used from then on.
+    """
+    global _parallel_available
+    if not NUMBA_AVAILABLE or pixel_count < PARALLEL_MIN_PIXELS:
+        return False
+    if _parallel_available is None:
+        with _parallel_lock:
+            if _parallel_available is None:
+                try:
+                    _embed_kernel(np.zeros((1, 3), dtype=np.uint8), np.zeros((1, 3), dtype=np.uint8),
+                                  np.zeros((1, 3), dtype=np.uint8))
+                    _parallel_available = True
+                except ValueError:
+                    # "No threading layer could be loaded"
+                    _parallel_available = False
+    return _parallel_available
+
+
+def embed(target: np.ndarray, keep: np.ndarray, values: np.ndarray) -> None:
+    """Rewrite target in place as (target & keep) | values."""
+    if _use_parallel(len(target)):
+        _embed_kernel(target, keep, values)
+    else:
+        np.bitwise_and(target, keep, out=target)
+        np.bitwise_or(target, values, out=target)
+
+
+def extract_bits(pixels: np.ndarray, indices: list[int], bits_per_channel: int, bit_count: int) -> np.ndarray:
+    """Read the low bits_per_channel bits of the selected channel columns, MSB first."""
+    columns = len(indices)
+    pixel_count = min(len(pixels), -(-bit_count // (columns * bits_per_channel)))
+    pixels = pixels[:pixel_count]
+
+    if _use_parallel(pixel_count):
+        out = np.empty(pixel_count * columns * bits_per_channel, dtype=np.uint8)
+        _extract_kernel(pixels, np.asarray(indices, dtype=np.int64), bits_per_channel, out)
+        return out[:bit_count]
+
+    shifts = np.arange(bits_per_channel - 1, -1, -1, dtype=np.uint8)
+    return ((pixels[:, indices, None] >> shifts) & 1).ravel()[:bit_count]
+
+
+def warmup() -> None:
+    """Compile (or load from the on-disk cache) the kernels so requests don't pay for JIT."""
+    if not NUMBA_AVAILABLE:
+        return
+    # Also loads the threading layer; the parallel kernels are skipped if none is thread-safe
+    if _use_parallel(PARALLEL_MIN_PIXELS):
+        rgba = np.zeros((2, 4), dtype=np.uint8)
+        for target in (rgba[:, :3], np.zeros((2, 3), dtype=np.uint8)):
+            _embed_kernel(target, np.zeros((2, 3), dtype=np.uint8), np.zeros((2, 3), dtype=np.uint8))
+        for pixels in (rgba[:, :3], np.zeros((2, 3), dtype=np.uint8)):
+            _extract_kernel(pixels, np.arange(3, dtype=np.int64), 1, np.empty(6, dtype=np.uint8))
+    for kernel in (_unfilter_average_kernel, _unfilter_paeth_kernel):
+        kernel(np.zeros(6, dtype=np.int32), np.zeros(6, dtype=np.int32), 3)
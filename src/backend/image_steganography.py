@@ -0,0 +1,473 @@
+import io
+from base64 import b64decode, b64encode
+from zlib import compress, decompress, error as zlib_error
+
+import numpy as np
+import piexif
+from PIL import Image
+
+import image_kernels
+from png_io import open_png_rows, set_deflate_threads, write_png, write_png_rows
+
+
+class _PixelReader:
+    """Hands out the leading pixels of an image, decoding rows only as they are needed."""
+
+    def __init__(self, width: int, height: int, rows):
+        self.pixel_count = width * height
+        self._rows = rows
+        self._loaded = []
+        self._loaded_count = 0
+
+    def first(self, pixel_count: int) -> np.ndarray:
+        """Return the RGB channels of the first pixel_count pixels as an (n, 3) array."""
+        while self._loaded_count < pixel_count:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._loaded.append(row[:, :3])
+            self._loaded_count += len(row)
+        if not self._loaded:
+            return np.empty((0, 3), dtype=np.uint8)
+        if len(self._loaded) > 1:
+            self._loaded = [np.concatenate(self._loaded)]
+        return self._loaded[0][:pixel_count]
+
+
+class ImageSteganography:
+    """LSB image steganography using whole-array NumPy bit operations."""
+
+    # Payload header: magic, format version, flags and the payload length in bytes.
+    MAGIC = b'SG'
+    VERSION = 1
+    HEADER_BYTES = 8
+    HEADER_PIXELS = -(-HEADER_BYTES * 8 // 3)
+    # The header itself is always written one bit per R, G and B channel.
+    CHANNEL_BITS = {'R': 1, 'G': 2, 'B': 4}
+    MAX_BITS_PER_CHANNEL = 4
+
+    # Longest "<length>:" prefix we look for when revealing a stegano-format payload.
+    MAX_PREFIX_BYTES = 16
+    # Upper bound on the size of the row strip held in memory while embedding.
+    TILE_BYTES = 4 * 1024 * 1024
+
+    # JPEG markers: SOI, SOS, APP0 (JFIF), APP1 (Exif) and the parameterless markers.
+    SOI = b'\xff\xd8'
+    SOS = 0xDA
+    APP0 = 0xE0
+    APP1 = 0xE1
+    STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+    EXIF_HEADER = b'Exif\x00\x00'
+    MAX_SEGMENT_LENGTH = 0xFFFF
+
+    # Uploads hidden in pixel LSBs and in the JPEG Exif header respectively.
+    LSB_EXTENSIONS = {'png', 'tiff', 'tif', 'webp'}
+    EXIF_EXTENSIONS = {'jpg', 'jpeg', 'jfif', 'pjp', 'pjpeg'}
+    # Lossless outputs for LSB encoding; the default keeps the upload's own format.
+    OUTPUT_FORMATS = {'png', 'png-optimized', 'webp', 'tiff'}
+    DEFAULT_OUTPUT_FORMATS = {'png': 'png', 'tiff': 'tiff', 'tif': 'tiff', 'webp': 'webp'}
+
+    def _parse_channels(self, channels: str) -> int:
+        """Turn a channel selection such as "RGB" or "gb" into a channel bit mask."""
+        mask = 0
+        for name in channels.upper():
+            if name not in self.CHANNEL_BITS or mask & self.CHANNEL_BITS[name]:
+                raise ValueError("Channels must be a selection of R, G and B.")
+            mask |= self.CHANNEL_BITS[name]
+        if not mask:
+            raise ValueError("At least one channel must be selected.")
+        return mask
+
+    def _channel_indices(self, mask: int) -> list[int]:
+        """Column indices (R=0, G=1, B=2) of the channels set in mask."""
+        return [i for i, bit in enumerate(self.CHANNEL_BITS.values()) if mask & bit]
+
+    def _pack_values(self, data: bytes, columns: int, bits_per_channel: int) -> np.ndarray:
+        """Split bytes into (n_pixels, columns) values of bits_per_channel bits, MSB first."""
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        bits = np.concatenate([bits, np.zeros(-len(bits) % (columns * bits_per_channel), dtype=np.uint8)])
+        weights = 1 << np.arange(bits_per_channel - 1, -1, -1, dtype=np.uint8)
+        return (bits.reshape(-1, columns, bits_per_channel) * weights).sum(axis=2, dtype=np.uint8)
+
+    def _message_bits(self, message: str, bits_per_channel: int, mask: int):
+        """Build per-pixel (values, keep) arrays: a fixed header followed by the UTF-8 message.
+
+        Each channel is rewritten as (channel & keep) | value, so the header pixels
+        and the k-LSB payload pixels can be embedded with the same array operation.
+        """
+        message_bytes = message.encode('utf-8')
+        flags = (bits_per_channel - 1) | (mask << 2)
+        header = self.MAGIC + bytes([self.VERSION, flags]) + len(message_bytes).to_bytes(4, 'big')
+
+        indices = self._channel_indices(mask)
+        payload = self._pack_values(message_bytes, len(indices), bits_per_channel)
+        values = np.zeros((self.HEADER_PIXELS + len(payload), 3), dtype=np.uint8)
+        values[:self.HEADER_PIXELS] = self._pack_values(header, 3, 1)
+        values[self.HEADER_PIXELS:, indices] = payload
+
+        keep = np.full_like(values, 0xFF)
+        keep[:self.HEADER_PIXELS] = 0xFE
+        keep[self.HEADER_PIXELS:, indices] = (0xFF << bits_per_channel) & 0xFF
+        return values, keep
+
+    def _rgb_channels(self, pixels: np.ndarray) -> np.ndarray:
+        """Return an (n_pixels, 3) view over the colour channels, ignoring alpha."""
+        return pixels.reshape(-1, pixels.shape[-1])[:, :3]
+
+    def _read_lsb_bytes(self, channels: np.ndarray, byte_count: int) -> bytes:
+        """Pack the LSBs of the given pixels into byte_count bytes."""
+        bit_count = byte_count * 8
+        pixel_count = -(-bit_count // 3)
+        bits = (channels[:pixel_count] & 1).ravel()[:bit_count]
+        return np.packbits(bits).tobytes()
+
+    def warmup(self, deflate_threads: int | None = None) -> None:
+        """Compile the pixel kernels ahead of the first request, optionally sizing the PNG deflate pool."""
+        image_kernels.warmup()
+        if deflate_threads is not None:
+            set_deflate_threads(deflate_threads)
+
+    def _pixel_reader(self, source) -> _PixelReader:
+        """Wrap an image, or a PNG/TIFF stream, in a row-by-row pixel reader.
+
+        Plain 8-bit PNG streams are inflated scanline by scanline; anything else
+        is decoded in full by Pillow.
+        """
+        if not isinstance(source, Image.Image):
+            png = open_png_rows(source)
+            if png is not None:
+                width, height, _, rows = png
+                return _PixelReader(width, height, rows)
+            source = Image.open(source)
+
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGB')
+        width, height = source.size
+        return _PixelReader(width, height, iter(np.asarray(source)))
+
+    def capacity(self, image: Image.Image, bits_per_channel: int = 1, channels: str = 'RGB') -> int:
+        """Maximum message size in UTF-8 bytes for the given embedding settings.
+
+        Only the image size is used, so a lazily opened image is never decoded.
+        """
+        width, height = image.size
+        return self._pixel_capacity(width * height, bits_per_channel, channels)
+
+    def _pixel_capacity(self, pixel_count: int, bits_per_channel: int, channels: str) -> int:
+        columns = len(self._channel_indices(self._parse_channels(channels)))
+        payload_pixels = max(0, pixel_count - self.HEADER_PIXELS)
+        return payload_pixels * columns * bits_per_channel // 8
+
+    def _check_message(self, message: str, bits_per_channel: int, channels: str, pixel_count: int) -> int:
+        """Validate the embedding settings for a cover of pixel_count pixels, returning the channel mask."""
+        if not message:
+            raise ValueError("Message is empty.")
+        if not 1 <= bits_per_channel <= self.MAX_BITS_PER_CHANNEL:
+            raise ValueError(f"bits_per_channel must be between 1 and {self.MAX_BITS_PER_CHANNEL}.")
+        mask = self._parse_channels(channels)
+        if len(message.encode('utf-8')) > self._pixel_capacity(pixel_count, bits_per_channel, channels):
+            raise ValueError("Message is too long to be hidden in this image.")
+        return mask
+
+    def hide(self, image: Image.Image, message: str, bits_per_channel: int = 1,
+             channels: str = 'RGB', in_place: bool = False) -> Image.Image:
+        """Hide a message in an RGB(A) image using bits_per_channel LSBs of the selected channels.
+
+        Only the row strips that hold payload bits are copied out, modified and
+        pasted back. The caller's image is left untouched unless in_place is set,
+        in which case an RGB(A) image is modified and returned without a full-size copy.
+        Pillow still decodes the whole image; hide_rows streams PNG covers instead.
+        """
+        width, height = image.size
+        mask = self._check_message(message, bits_per_channel, channels, width * height)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        elif not in_place:
+            image = image.copy()
+
+        values, keep = self._message_bits(message, bits_per_channel, mask)
+        tile_rows = max(1, self.TILE_BYTES // (width * len(image.mode)))
+        payload_rows = -(-len(values) // width)
+
+        for top in range(0, payload_rows, tile_rows):
+            bottom = min(top + tile_rows, payload_rows)
+            tile = np.array(image.crop((0, top, width, bottom)))
+            tile_values = values[top * width:bottom * width]
+            target = self._rgb_channels(tile)[:len(tile_values)]
+            image_kernels.embed(target, keep[top * width:bottom * width], tile_values)
+            image.paste(Image.fromarray(tile, image.mode), (0, top))
+        return image
+
+    def hide_rows(self, width: int, height: int, rows, message: str, bits_per_channel: int = 1,
+                  channels: str = 'RGB'):
+        """Hide a message in a stream of (width, channels) RGB(A) rows, yielding the rows to write.
+
+        Rows holding payload bits are copied and modified one at a time and the
+        rest pass through untouched, so the image is never held in memory whole.
+        The settings are checked before this returns.
+        """
+        mask = self._check_message(message, bits_per_channel, channels, width * height)
+        values, keep = self._message_bits(message, bits_per_channel, mask)
+        payload_rows = -(-len(values) // width)
+
+        def stego_rows():
+            for index, row in enumerate(rows):
+                if index < payload_rows:
+                    # Copied: the reader unfilters the next row against this one
+                    row = row.copy()
+                    row_values = values[index * width:(index + 1) * width]
+                    target = self._rgb_channels(row)[:len(row_values)]
+                    image_kernels.embed(target, keep[index * width:(index + 1) * width], row_values)
+                yield row
+
+        return stego_rows()
+
+    def reveal(self, source) -> str | None:
+        """Extract a hidden message from an image or image stream, or None if there is none.
+
+        The header records the bits per channel and channel selection, and only
+        the rows holding the header and payload are decoded. Images written by
+        stegano's lsb module are recognised by their "<length>:" prefix.
+        """
+        reader = self._pixel_reader(source)
+        header_bits = image_kernels.extract_bits(
+            reader.first(self.HEADER_PIXELS), [0, 1, 2], 1, self.HEADER_BYTES * 8)
+        header = np.packbits(header_bits).tobytes()
+        if header[:2] != self.MAGIC or header[2] != self.VERSION:
+            return self._reveal_stegano(reader)
+
+        flags = header[3]
+        bits_per_channel = (flags & 0b11) + 1
+        # Headers without a channel mask use all three channels
+        indices = self._channel_indices((flags >> 2) or 0b111)
+        length = int.from_bytes(header[4:8], 'big')
+
+        end = self.HEADER_PIXELS + -(-length * 8 // (len(indices) * bits_per_channel))
+        if end > reader.pixel_count:
+            return None
+        payload_bits = image_kernels.extract_bits(
+            reader.first(end)[self.HEADER_PIXELS:], indices, bits_per_channel, length * 8)
+        try:
+            return np.packbits(payload_bits).tobytes().decode('utf-8')
+        except UnicodeDecodeError:
+            # A header-like pattern in an image that carries no message
+            return None
+
+    def _reveal_stegano(self, reader: _PixelReader) -> str | None:
+        """Extract a message in stegano's lsb format, or None if the image carries none."""
+        available = reader.pixel_count * 3 // 8
+        prefix_bytes = min(self.MAX_PREFIX_BYTES, available)
+        prefix = self._read_lsb_bytes(reader.first(-(-prefix_bytes * 8 // 3)), prefix_bytes)
+        digits, sep, _ = prefix.partition(b':')
+        if not sep or not digits.isdigit():
+            return None
+
+        start = len(digits) + 1
+        end = start + int(digits)
+        if end > available:
+            return None
+
+        payload = self._read_lsb_bytes(reader.first(-(-end * 8 // 3)), end)[start:]
+        try:
+            return payload.decode('utf-8')
+        except UnicodeDecodeError:
+            # stegano < 3 wrote one byte per character rather than UTF-8
+            return payload.decode('latin-1')
+
+    def check_capacity(self, stream, ext: str, bits_per_channel: int = 1, channels: str = 'RGB',
+                       message: str | None = None) -> dict:
+        """Report how many message bytes an upload can carry without decoding its pixels.
+
+        LSB formats only need the size from the image header; JPEGs only need their
+        marker segments. If a message is given, also report whether it fits exactly.
+        """
+        if ext in self.EXIF_EXTENSIONS:
+            data = stream.read()
+            capacity = self.exif_capacity(data)
+            fits = None
+            if message:
+                _, _, exif_bytes = self._exif_splice(data, compress(b64encode(message.encode('utf-8'))))
+                fits = len(exif_bytes) + 2 <= self.MAX_SEGMENT_LENGTH
+            return {"capacity": capacity, "method": "exif", "fits": fits}
+
+        if ext not in self.LSB_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {ext}")
+        if not 1 <= bits_per_channel <= self.MAX_BITS_PER_CHANNEL:
+            raise ValueError(f"bits_per_channel must be between 1 and {self.MAX_BITS_PER_CHANNEL}.")
+        capacity = self.capacity(Image.open(stream), bits_per_channel, channels)
+        fits = len(message.encode('utf-8')) <= capacity if message else None
+        return {"capacity": capacity, "method": "lsb", "fits": fits}
+
+    def encode_file(self, stream, ext: str, message: str, bits_per_channel: int = 1,
+                    channels: str = 'RGB', compression: int = 6,
+                    output_format: str | None = None) -> tuple[bytes, str, str]:
+        """Hide a message in an uploaded image, returning (data, mimetype, extension).
+
+        compression is the zlib level (0-9) for PNG output; lower is faster but larger.
+        output_format picks the lossless container for LSB output: png, png-optimized
+        (smallest PNG, slower), webp (lossless) or tiff.
+        """
+        if not 0 <= compression <= 9:
+            raise ValueError("compression must be between 0 and 9.")
+        if ext in self.EXIF_EXTENSIONS:
+            return self.hide_exif(stream.read(), message), 'image/jpeg', 'jpg'
+        if ext not in self.LSB_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {ext}")
+        output_format = output_format or self.DEFAULT_OUTPUT_FORMATS[ext]
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of: {', '.join(sorted(self.OUTPUT_FORMATS))}.")
+
+        if output_format == 'png':
+            png = open_png_rows(stream)
+            if png is not None:
+                width, height, depth, rows = png
+                rows = self.hide_rows(width, height, rows, message, bits_per_channel, channels)
+                return write_png_rows(width, height, depth, rows, compression), 'image/png', 'png'
+
+        # The image was opened just for this, so it can be written in place
+        image = self.hide(Image.open(stream), message, bits_per_channel, channels, in_place=True)
+        if output_format == 'png':
+            return write_png(np.asarray(image), compression), 'image/png', 'png'
+
+        buffer = io.BytesIO()
+        if output_format == 'png-optimized':
+            image.save(buffer, format='PNG', optimize=True)
+            return buffer.getvalue(), 'image/png', 'png'
+        if output_format == 'webp':
+            # exact keeps the RGB values under fully transparent pixels
+            image.save(buffer, format='WEBP', lossless=True, quality=100, exact=True)
+            return buffer.getvalue(), 'image/webp', 'webp'
+        image.save(buffer, format='TIFF')
+        return buffer.getvalue(), 'image/tiff', 'tif' if ext == 'tif' else 'tiff'
+
+    def sniff_extension(self, stream) -> str | None:
+        """Identify an upload from its magic bytes, returning a canonical extension or None."""
+        start = stream.tell()
+        head = stream.read(12)
+        stream.seek(start)
+        if head.startswith(b'\x89PNG\r\n\x1a\n'):
+            return 'png'
+        if head.startswith(self.SOI):
+            return 'jpg'
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return 'webp'
+        if head[:4] in (b'II*\x00', b'MM\x00*'):
+            return 'tiff'
+        return None
+
+    def decode_file(self, stream, ext: str) -> str | None:
+        """Extract the hidden message from an uploaded image, or None if there is none.
+
+        The format is taken from the file's magic bytes, falling back to ext.
+        """
+        ext = self.sniff_extension(stream) or ext
+        if ext in self.EXIF_EXTENSIONS:
+            return self.reveal_exif(stream.read())
+        if ext not in self.LSB_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {ext}")
+        return self.reveal(stream)
+
+    def _jpeg_segments(self, data: bytes):
+        """Yield (marker, start, end) for each JPEG marker segment up to and including SOS."""
+        if not data.startswith(self.SOI):
+            raise ValueError("Not a JPEG file.")
+
+        pos = len(self.SOI)
+        while pos + 4 <= len(data):
+            if data[pos] != 0xFF:
+                raise ValueError("Corrupt JPEG marker stream.")
+            marker = data[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            if marker in self.STANDALONE_MARKERS:
+                pos += 2
+                continue
+
+            end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+            yield marker, pos, end
+            if marker == self.SOS:
+                return
+            pos = end
+
+    def _find_exif_segment(self, data: bytes):
+        """Return (start, end) of the Exif APP1 segment, or None."""
+        for marker, start, end in self._jpeg_segments(data):
+            if marker == self.APP1 and data[start + 4:start + 10] == self.EXIF_HEADER:
+                return start, end
+        return None
+
+    def _exif_splice(self, data: bytes, description: bytes):
+        """Build the Exif block carrying description, returning (insert_at, replace_end, exif_bytes).
+
+        An existing Exif APP1 segment is replaced with its other tags preserved;
+        otherwise the new segment goes right after SOI and any JFIF APP0 segment.
+        """
+        exif_dict = {"0th": {}}
+        insert_at, replace_end = len(self.SOI), None
+        for marker, start, end in self._jpeg_segments(data):
+            if marker == self.APP1 and data[start + 4:start + 10] == self.EXIF_HEADER:
+                insert_at, replace_end = start, end
+                try:
+                    exif_dict = piexif.load(data[start + 4:end])
+                except Exception:
+                    pass
+                break
+            if marker != self.APP0:
+                break
+            # Keep the JFIF APP0 segment first, as decoders expect
+            insert_at = end
+
+        exif_dict.setdefault("0th", {})[piexif.ImageIFD.ImageDescription] = description
+        try:
+            exif_bytes = piexif.dump(exif_dict)
+        except Exception:
+            # Existing Exif data piexif cannot re-serialise is dropped
+            exif_bytes = piexif.dump({"0th": {piexif.ImageIFD.ImageDescription: description}})
+        return insert_at, replace_end, exif_bytes
+
+    def exif_capacity(self, data: bytes) -> int:
+        """Message size in UTF-8 bytes guaranteed to fit in the Exif segment of a JPEG.
+
+        The payload is compressed, so typical text fits well beyond this; it assumes
+        zlib cannot shrink the base64 text at all.
+        """
+        _, _, exif_bytes = self._exif_splice(data, b'')
+        available = self.MAX_SEGMENT_LENGTH - 2 - len(exif_bytes) - 1
+        # zlib's worst case: 5 bytes per 16 KB stored block plus a 6-byte wrapper
+        base64_length = available - 6 - 5 * -(-available // 16383)
+        return max(0, base64_length // 4 * 3)
+
+    def hide_exif(self, data: bytes, message: str) -> bytes:
+        """Hide a message in the Exif ImageDescription of a JPEG byte stream.
+
+        Uses the same payload as stegano's exifHeader (zlib-compressed base64) and
+        splices the APP1 segment into the original bytes without touching the pixels.
+        """
+        if not message:
+            raise ValueError("Message is empty.")
+
+        description = compress(b64encode(message.encode('utf-8')))
+        insert_at, replace_end, exif_bytes = self._exif_splice(data, description)
+        if len(exif_bytes) + 2 > self.MAX_SEGMENT_LENGTH:
+            raise ValueError("Message is too long to be hidden in this image.")
+
+        segment = b'\xff\xe1' + (len(exif_bytes) + 2).to_bytes(2, 'big') + exif_bytes
+        return data[:insert_at] + segment + data[replace_end or insert_at:]
+
+    def reveal_exif(self, data: bytes) -> str | None:
+        """Extract an exifHeader-format message from a JPEG byte stream, or None."""
+        location = self._find_exif_segment(data)
+        if location is None:
+            return None
+
+        start, end = location
+        exif_dict = piexif.load(data[start + 4:end])
+        description = exif_dict.get("0th", {}).get(piexif.ImageIFD.ImageDescription)
+        if not description:
+            return None
+        try:
+            return b64decode(decompress(description)).decode('utf-8')
+        except (zlib_error, ValueError):
+            # An ordinary camera description rather than a hidden message
+            return None
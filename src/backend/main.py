@@ -1,11 +1,16 @@
 import io
 import os
+import json
+import zipfile
+import multiprocessing
 import traceback
 import tempfile
-from flask import Flask, request, send_file, jsonify
-from PIL import Image
-from stegano import lsb, exifHeader
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import Flask, Response, request, send_file, jsonify
 from text_steganography import TextSteganography
+from capacity_sessions import CapacitySessionStore
+from image_steganography import ImageSteganography
+from png_io import set_deflate_threads
 from audio_steganography import AudioSteganography
 import wave
 import numpy as np
@@ -13,7 +18,13 @@ from video_steganography import VideoSteganography
 
 app = Flask(__name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpeg', 'jpg', 'tiff', 'jfif', 'pjp', 'pjpeg', 'tif'}
+ALLOWED_EXTENSIONS = {'png', 'jpeg', 'jpg', 'tiff', 'jfif', 'pjp', 'pjpeg', 'tif', 'webp'}
+
+image_steg = ImageSteganography()
+# When main.py is run as a script, spawned batch pool processes re-import it as
+# __mp_main__; they warm up through the pool initializer instead
+if __name__ != '__mp_main__':
+    image_steg.warmup()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -36,74 +47,74 @@ def encode_image():
         ext = os.path.splitext(filename)[1].lower().lstrip('.')
 
         if ext not in ALLOWED_EXTENSIONS:
-            return jsonify({"error": "Invalid file type. Please use PNG, JPG, JPEG, or TIFF."}), 400
-
-        # Open the image
-        image = Image.open(file.stream)
+            return jsonify({"error": "Invalid file type. Please use PNG, JPG, JPEG, TIFF, or WebP."}), 400
 
-        # Encode for LSB-compatible formats
-        if ext in ['png', 'tiff', 'tif']:
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+        try:
+            bits_per_channel = int(request.form.get('bits_per_channel', 1))
+            compression = int(request.form.get('compression', 6))
+        except ValueError:
+            return jsonify({"error": "bits_per_channel and compression must be integers."}), 400
+        channels = request.form.get('channels', 'RGB')
 
-            try:
-                secret_image = lsb.hide(image, message)
-                buffer = io.BytesIO()
-                format_used = 'TIFF' if ext in ['tiff', 'tif'] else 'PNG'
-                mimetype = 'image/tiff' if ext in ['tiff', 'tif'] else 'image/png'
-                download_name = f"encoded_image.{ext}"
-                
-                secret_image.save(buffer, format=format_used)
-                buffer.seek(0)
-                
-                return send_file(buffer, mimetype=mimetype, as_attachment=True, download_name=download_name)
-            except ValueError:
-                return jsonify({"error": "Message is too long to be hidden in this image."}), 400
-            except Exception as e:
-                traceback.print_exc()
-                return jsonify({"error": f"Failed to encode message: {e}"}), 500
-        
-        # Encode for JPEG-based formats
-        elif ext in ['jpg', 'jpeg', 'jfif', 'pjp', 'pjpeg']:
-            try:
-                # Convert to valid JPEG
-                image = image.convert("RGB")
-                
-                # Use cross-platform temporary files
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_input:
-                    image.save(temp_input.name, "JPEG")
-                    temp_input_path = temp_input.name
-                
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_output:
-                    temp_output_path = temp_output.name
-
-                # Embed message using exifHeader
-                exifHeader.hide(temp_input_path, temp_output_path, secret_message=message)
-
-                result = send_file(
-                    temp_output_path,
-                    mimetype='image/jpeg',
-                    as_attachment=True,
-                    download_name="encoded_image.jpg"
-                )
-                
-                # Clean up temporary files
-                try:
-                    os.unlink(temp_input_path)
-                    os.unlink(temp_output_path)
-                except:
-                    pass
-                
-                return result
-            except Exception as e:
-                traceback.print_exc()
-                return jsonify({"error": f"Failed to encode message in JPEG: {e}"}), 500
+        try:
+            data, mimetype, out_ext = image_steg.encode_file(file.stream, ext, message, bits_per_channel,
+                                                             channels, compression,
+                                                             request.form.get('output_format') or None)
+            return send_file(io.BytesIO(data), mimetype=mimetype, as_attachment=True,
+                             download_name=f"encoded_image.{out_ext}")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            traceback.print_exc()
+            return jsonify({"error": f"Failed to encode message: {e}"}), 500
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
 
 
+@app.route("/api/image/check-capacity", methods=["POST"])
+def check_image_capacity():
+    """Check image capacity for steganography from the file header alone"""
+    try:
+        if 'image' not in request.files:
+            return jsonify({"success": False, "error": "No image file provided."}), 400
+
+        file = request.files['image']
+        if file.filename == '':
+            return jsonify({"success": False, "error": "No selected file."}), 400
+
+        ext = os.path.splitext(file.filename)[1].lower().lstrip('.')
+        if ext not in ALLOWED_EXTENSIONS:
+            return jsonify({"success": False, "error": "Invalid file type. Please use PNG, JPG, JPEG, TIFF, or WebP."}), 400
+
+        try:
+            bits_per_channel = int(request.form.get('bits_per_channel', 1))
+        except ValueError:
+            return jsonify({"success": False, "error": "bits_per_channel must be an integer."}), 400
+
+        try:
+            capacity_info = image_steg.check_capacity(file.stream, ext, bits_per_channel,
+                                                      request.form.get('channels', 'RGB'),
+                                                      request.form.get('message') or None)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        response = {
+            "success": True,
+            "file_format": ext.upper(),
+            "method": capacity_info["method"],
+            "actual_max_characters": capacity_info["capacity"]
+        }
+        if capacity_info["fits"] is not None:
+            response["fits"] = capacity_info["fits"]
+        return jsonify(response), 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"success": False, "error": f"Server error: {str(e)}"}), 500
+
+
 @app.route("/api/image/decode", methods=["POST"])
 def decode_image():
     try:
@@ -119,45 +130,219 @@ def decode_image():
         ext = os.path.splitext(filename)[1].lower().lstrip('.')
 
         if ext not in ALLOWED_EXTENSIONS:
-            return jsonify({"error": "Invalid file type. Please use PNG, JPG, JPEG, or TIFF."}), 400
+            return jsonify({"error": "Invalid file type. Please use PNG, JPG, JPEG, TIFF, or WebP."}), 400
+
+        try:
+            message = image_steg.decode_file(file.stream, ext)
+            if message:
+                return jsonify({"message": message}), 200
+            else:
+                return jsonify({"message": None, "error": "No hidden message found in this image."}), 200
+        except Exception as e:
+            traceback.print_exc()
+            return jsonify({"error": f"Failed to decode message: {e}"}), 500
 
-        image = Image.open(file.stream)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
 
-        if ext in ['png', 'tiff','tif']:
-            try:
-                message = lsb.reveal(image)
-                if message:
-                    return jsonify({"message": message}), 200
-                else:
-                    return jsonify({"message": None, "error": "No hidden message found in this image."}), 200
-            except Exception as e:
-                traceback.print_exc()
-                return jsonify({"error": f"Failed to decode message: {e}"}), 500
 
-        elif ext in ['jpg', 'jpeg','jfif', 'pjp', 'pjpeg']:
-            try:
-                # Save to disk temporarily for exifHeader using cross-platform temp files
-                with tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False) as temp_file:
-                    file.stream.seek(0)
-                    temp_file.write(file.read())
-                    temp_path = temp_file.name
+"""Batch Image Steganography"""
+
+# Workers are spawned rather than forked: forking after numba has started its
+# thread pool can deadlock the children.
+_image_pool = None
+
+# Each server worker gets its own pool, so by default the CPUs are split between the
+# WEB_CONCURRENCY workers gunicorn starts; IMAGE_POOL_WORKERS sets the size directly.
+# Unset, empty and non-positive values fall back to the defaults.
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY") or 1))
+CPU_SHARE = max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+IMAGE_POOL_WORKERS = max(0, int(os.environ.get("IMAGE_POOL_WORKERS") or 0)) or CPU_SHARE
+
+# PNG deflate threads: this process's CPU share for single-image requests, split
+# evenly between the batch processes in theirs.
+set_deflate_threads(CPU_SHARE)
+
+def get_image_pool():
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_POOL_WORKERS,
+                                          mp_context=multiprocessing.get_context('spawn'),
+                                          initializer=image_steg.warmup,
+                                          initargs=(CPU_SHARE // IMAGE_POOL_WORKERS,))
+    return _image_pool
 
-                message = exifHeader.reveal(temp_path).decode('utf-8')
-                
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                
-                if message:
-                    return jsonify({"message": message}), 200
-                else:
-                    return jsonify({"message": None, "error": "No hidden message found in this image."}), 200
-            except Exception as e:
-                traceback.print_exc()
-                return jsonify({"error": f"Failed to decode JPEG message: {e}"}), 500
 
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that lets zipfile build an archive while it is being streamed out."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+# Limits on what a batch 'archive' may expand to. They are checked against the sizes the
+# ZIP declares before anything is inflated; zipfile never inflates an entry past its
+# declared size, so a lying entry fails its CRC check instead.
+BATCH_ARCHIVE_MAX_ENTRIES = 1000
+BATCH_ARCHIVE_MAX_ENTRY_BYTES = 50 * 1024 * 1024
+BATCH_ARCHIVE_MAX_TOTAL_BYTES = 200 * 1024 * 1024
+
+
+class BatchArchiveTooLarge(Exception):
+    """A batch archive holds more entries or uncompressed bytes than the limits allow."""
+
+
+def collect_batch_images():
+    """Gather (filename, data, ext) items from the 'images' files and an optional 'archive' ZIP."""
+    items = [(f.filename, f.read()) for f in request.files.getlist('images') if f.filename]
+
+    if 'archive' in request.files:
+        with zipfile.ZipFile(request.files['archive'].stream) as archive:
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+            if len(entries) > BATCH_ARCHIVE_MAX_ENTRIES:
+                raise BatchArchiveTooLarge(
+                    f"Archive holds more than {BATCH_ARCHIVE_MAX_ENTRIES} files.")
+            total = 0
+            for info in entries:
+                total += info.file_size
+                if info.file_size > BATCH_ARCHIVE_MAX_ENTRY_BYTES:
+                    raise BatchArchiveTooLarge(
+                        f"{info.filename} is larger than {BATCH_ARCHIVE_MAX_ENTRY_BYTES // (1024 * 1024)}MB uncompressed.")
+                if total > BATCH_ARCHIVE_MAX_TOTAL_BYTES:
+                    raise BatchArchiveTooLarge(
+                        f"Archive is larger than {BATCH_ARCHIVE_MAX_TOTAL_BYTES // (1024 * 1024)}MB uncompressed.")
+            for info in entries:
+                items.append((os.path.basename(info.filename), archive.read(info)))
+
+    return [(name, data, get_file_extension(name)) for name, data in items]
+
+
+def batch_messages(filenames):
+    """Per-item messages from 'messages' (a JSON list or filename-to-message object) or a shared 'message'."""
+    default = request.form.get('message', '')
+    messages = json.loads(request.form.get('messages') or 'null')
+    if isinstance(messages, list):
+        return [messages[i] if i < len(messages) else default for i in range(len(filenames))]
+    if isinstance(messages, dict):
+        return [messages.get(name, default) for name in filenames]
+    return [default] * len(filenames)
+
+
+@app.route("/api/image/encode/batch", methods=["POST"])
+def encode_image_batch():
+    """Encode many images in a process pool, streaming back a ZIP as items finish."""
+    try:
+        items = collect_batch_images()
+        if not items:
+            return jsonify({"error": "No image files provided."}), 400
+
+        try:
+            messages = batch_messages([name for name, _, _ in items])
+            bits_per_channel = int(request.form.get('bits_per_channel', 1))
+            compression = int(request.form.get('compression', 6))
+        except ValueError:
+            return jsonify({"error": "Invalid messages, bits_per_channel or compression."}), 400
+        channels = request.form.get('channels', 'RGB')
+        output_format = request.form.get('output_format') or None
+
+        pool = get_image_pool()
+        futures = {}
+        errors = {}
+        for (name, data, ext), message in zip(items, messages):
+            if ext not in ALLOWED_EXTENSIONS:
+                errors[name] = "Invalid file type."
+            elif not message:
+                errors[name] = "No message provided."
+            else:
+                future = pool.submit(image_steg.encode_file, io.BytesIO(data), ext, message,
+                                     bits_per_channel, channels, compression, output_format)
+                futures[future] = name
+
+        def generate():
+            sink = _ZipStream()
+            used_names = set()
+            with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        data, _, out_ext = future.result()
+                    except Exception as e:
+                        errors[name] = str(e)
+                        continue
+                    stem = os.path.splitext(name)[0]
+                    out_name = f"encoded_{stem}.{out_ext}"
+                    counter = 1
+                    while out_name in used_names:
+                        out_name = f"encoded_{stem}_{counter}.{out_ext}"
+                        counter += 1
+                    used_names.add(out_name)
+                    archive.writestr(out_name, data)
+                    yield sink.pop()
+                if errors:
+                    archive.writestr("errors.json", json.dumps(errors, indent=2))
+            yield sink.pop()
+
+        return Response(generate(), mimetype='application/zip',
+                        headers={"Content-Disposition": "attachment; filename=encoded_images.zip"})
+
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Archive is not a valid ZIP file."}), 400
+    except BatchArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
+
+
+@app.route("/api/image/decode/batch", methods=["POST"])
+def decode_image_batch():
+    """Decode many images in a process pool, streaming back one NDJSON line per item."""
+    try:
+        items = collect_batch_images()
+        if not items:
+            return jsonify({"error": "No image files provided."}), 400
+
+        pool = get_image_pool()
+        futures = {}
+        rejected = []
+        for name, data, ext in items:
+            if ext not in ALLOWED_EXTENSIONS:
+                rejected.append({"filename": name, "message": None, "error": "Invalid file type."})
+            else:
+                futures[pool.submit(image_steg.decode_file, io.BytesIO(data), ext)] = name
+
+        def generate():
+            for line in rejected:
+                yield json.dumps(line) + "\n"
+            for future in as_completed(futures):
+                line = {"filename": futures[future], "message": None}
+                try:
+                    line["message"] = future.result()
+                    if not line["message"]:
+                        line["error"] = "No hidden message found in this image."
+                except Exception as e:
+                    line["error"] = f"Failed to decode message: {e}"
+                yield json.dumps(line) + "\n"
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Archive is not a valid ZIP file."}), 400
+    except BatchArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
@@ -173,10 +358,16 @@ def home():
         "version": "1.0",
         "endpoints": {
             "/api/image/encode": "POST - Encode a message into an image",
+            "/api/image/check-capacity": "POST - Check image capacity for steganography",
             "/api/image/decode": "POST - Decode a message from an image",
+            "/api/image/encode/batch": "POST - Encode messages into many images, returned as a ZIP",
+            "/api/image/decode/batch": "POST - Decode messages from many images, returned as NDJSON",
             "/api/text/check-capacity": "POST - Check text capacity for steganography",
-            "/api/text/encode": "POST - Encode a message into text",
+            "/api/text/capacity-session": "POST - Open a capacity session; PATCH/DELETE /api/text/capacity-session/<id> to edit or close it",
+            "/api/text/encode": "POST - Encode a message into text (response: json, or text/download to stream plain text)",
             "/api/text/decode": "POST - Decode a message from text",
+            "/api/text/encode/batch": "POST - Encode many texts (JSON array or NDJSON), streaming NDJSON results",
+            "/api/text/decode/batch": "POST - Decode many texts (JSON array or NDJSON), streaming NDJSON results",
             "/api/audio/check-capacity": "POST - Check audio capacity for steganography",
             "/api/audio/encode": "POST - Encode a message into audio",
             "/api/audio/decode": "POST - Decode a message from audio",
@@ -197,13 +388,17 @@ def info():
         "version": "1.0",
         "features": {
             "image_steganography": {
+                "check_capacity": "Check the capacity of an image for hiding messages",
                 "encode": "Hide a message in an image",
-                "decode": "Extract a hidden message from an image"
+                "decode": "Extract a hidden message from an image",
+                "batch": "Encode or decode many images in one request"
             },
             "text_steganography": {
                 "check_capacity": "Check the capacity of text for hiding messages",
                 "encode": "Hide a message in text",
-                "decode": "Extract a hidden message from text"
+                "decode": "Extract a hidden message from text",
+                "batch": "Encode or decode many texts in one request",
+                "modes": "classic (one character per word) or dense (UTF-8 bytes, three per word); decode detects the mode"
             },
             "audio_steganography": {
                 "check_capacity": "Check the capacity of audio for hiding messages",
@@ -239,12 +434,26 @@ def check_capacity():
             }), 400
         
         cover_text = data.get('cover_text', '').strip()
+        mode = data.get('mode', 'classic')
         
         if not cover_text:
             return jsonify({
                 "success": False,
                 "error": "cover_text is required"
             }), 400
+
+        if mode not in steg.TEXT_MODES:
+            return jsonify({
+                "success": False,
+                "error": f"mode must be one of: {', '.join(steg.TEXT_MODES)}"
+            }), 400
+
+        # Both modes report under the same key; dense capacity is counted in UTF-8 bytes
+        if mode == 'dense':
+            return jsonify({
+                "actual_max_characters": steg.dense_capacity(cover_text),
+                "unit": "bytes",
+            }), 200
         
         # Count words exactly like original
         words = []
@@ -261,6 +470,7 @@ def check_capacity():
             # "word_count": word_count,
             # "max_characters_display": max_display,
             "actual_max_characters": bt,
+            "unit": "characters",
             # "message": f"Maximum number of characters that can be inserted: {max_display}",
             # "note": f"Actual encoding capacity: {bt} characters",
             # "next_step": "Use /encode endpoint with secret_message up to the capacity limit"
@@ -272,6 +482,78 @@ def check_capacity():
             "error": f"Server error: {str(e)}"
         }), 500
 
+capacity_sessions = CapacitySessionStore()
+
+def capacity_session_result(session_id, session):
+    if session.mode == "dense":
+        capacity, unit = steg.dense_word_capacity(session.word_count), "bytes"
+    else:
+        capacity, unit = session.word_count, "characters"
+    return {
+        "session_id": session_id,
+        "actual_max_characters": capacity,
+        "unit": unit,
+    }
+
+@app.route('/api/text/capacity-session', methods=['POST'])
+def open_capacity_session():
+    """Start tracking the capacity of a cover text that is being edited"""
+    data = request.get_json(silent=True) or {}
+    cover_text = data.get('cover_text', '')
+    mode = data.get('mode', 'classic')
+    if not isinstance(cover_text, str):
+        return jsonify({
+            "success": False,
+            "error": "cover_text must be a string"
+        }), 400
+    if mode not in steg.TEXT_MODES:
+        return jsonify({
+            "success": False,
+            "error": f"mode must be one of: {', '.join(steg.TEXT_MODES)}"
+        }), 400
+
+    session_id, session = capacity_sessions.open(
+        cover_text, mode, steg.DENSE_STRIP if mode == 'dense' else None)
+    return jsonify(capacity_session_result(session_id, session)), 201
+
+@app.route('/api/text/capacity-session/<session_id>', methods=['PATCH'])
+def edit_capacity_session(session_id):
+    """Apply edits {offset, deleted, inserted} (one, or a list under "edits") and return the new capacity
+
+    offset and deleted count UTF-16 code units, as JavaScript string indices do, of the
+    text as left by the previous edit. If any edit is invalid none of them are applied.
+    """
+    session = capacity_sessions.get(session_id)
+    if session is None:
+        return jsonify({
+            "success": False,
+            "error": "Capacity session not found or expired; open a new one"
+        }), 404
+
+    data = request.get_json(silent=True) or {}
+    edits = data.get('edits', [data])
+    try:
+        edits = [(int(edit.get('offset', 0)), int(edit.get('deleted', 0)),
+                  str(edit.get('inserted', ''))) for edit in edits]
+        session.apply_edits(edits)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid edit: {str(e)}"
+        }), 400
+
+    return jsonify(capacity_session_result(session_id, session)), 200
+
+@app.route('/api/text/capacity-session/<session_id>', methods=['DELETE'])
+def close_capacity_session(session_id):
+    """Forget a capacity session"""
+    if not capacity_sessions.close(session_id):
+        return jsonify({
+            "success": False,
+            "error": "Capacity session not found or expired"
+        }), 404
+    return jsonify({"success": True}), 200
+
 @app.route('/api/text/encode', methods=['POST'])
 def encode():
     """Encode secret message into cover text"""
@@ -286,6 +568,8 @@ def encode():
         
         cover_text = data.get('cover_text', '').strip()
         secret_message = data.get('secret_message', '').strip()
+        mode = data.get('mode', 'classic')
+        response_format = data.get('response', 'json')
         
         if not cover_text:
             return jsonify({
@@ -298,9 +582,31 @@ def encode():
                 "success": False,
                 "error": "secret_message is required"  
             }), 400
+
+        if mode not in steg.TEXT_MODES:
+            return jsonify({
+                "success": False,
+                "error": f"mode must be one of: {', '.join(steg.TEXT_MODES)}"
+            }), 400
+        
+        if response_format not in ('json', 'text', 'download'):
+            return jsonify({
+                "success": False,
+                "error": "response must be one of: json, text, download"
+            }), 400
+
+        # Plain text streamed as it is encoded, so big covers aren't built up in memory
+        if response_format != 'json':
+            result = steg.encode_stream(cover_text, secret_message, mode)
+            if not result["success"]:
+                return jsonify(result), 400
+            headers = {}
+            if response_format == 'download':
+                headers["Content-Disposition"] = "attachment; filename=stego_text.txt"
+            return Response(result["stego_chunks"], mimetype='text/plain', headers=headers)
         
-        # Perform encoding using original algorithm
-        result = steg.encode_message(cover_text, secret_message)
+        # Perform encoding using original algorithm, or the dense alphabet if asked for
+        result = steg.encode_message(cover_text, secret_message, mode)
         
         if result["success"]:
             return jsonify(result), 200
@@ -329,15 +635,21 @@ def decode():
                     "error": "No file selected"
                 }), 400
             
-            # Read the file content
+            # Stream the file through the decoder; it stops reading at the terminator word
             try:
-                file_content = file.read().decode('utf-8')
-                stego_text = file_content.strip()
+                result = steg.decode_stream(file.stream)
             except UnicodeDecodeError:
                 return jsonify({
                     "success": False,
                     "error": "Unable to decode file. Please ensure it's a valid UTF-8 text file."
                 }), 400
+
+            if result is None:
+                return jsonify({
+                    "success": False,
+                    "error": "Text file is empty"
+                }), 400
+            return jsonify(result), (200 if result["success"] else 400)
             
         else:
             # Handle JSON request (existing functionality)
@@ -372,10 +684,95 @@ def decode():
         }), 500
 
 
+def text_batch_items():
+    """Items of a batch text request: a JSON array body, or NDJSON with one object per line.
+
+    NDJSON lines are parsed lazily; a line that isn't valid JSON comes back as None.
+    """
+    body = request.get_data(as_text=True)
+    if body.lstrip().startswith('['):
+        return json.loads(body)
+
+    def parse(line):
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    # Only '\n' ends a record: str.splitlines() would also split on U+2028 and the
+    # other separators that JSON strings may carry unescaped
+    return (parse(line.removesuffix('\r')) for line in body.split('\n') if line.strip())
+
+
+def encode_text_item(item):
+    """Result of one batch encode item, with the same checks as /api/text/encode"""
+    if not isinstance(item, dict):
+        return {"success": False, "error": "Item must be a valid JSON object"}
+
+    cover_text = str(item.get('cover_text') or '').strip()
+    secret_message = str(item.get('secret_message') or '').strip()
+    mode = item.get('mode', 'classic')
+    if not cover_text:
+        return {"success": False, "error": "cover_text is required"}
+    if not secret_message:
+        return {"success": False, "error": "secret_message is required"}
+    if mode not in steg.TEXT_MODES:
+        return {"success": False, "error": f"mode must be one of: {', '.join(steg.TEXT_MODES)}"}
+    return steg.encode_message(cover_text, secret_message, mode)
+
+
+def decode_text_item(item):
+    """Result of one batch decode item, with the same checks as /api/text/decode"""
+    if not isinstance(item, dict):
+        return {"success": False, "error": "Item must be a valid JSON object"}
+
+    stego_text = str(item.get('stego_text') or '').strip()
+    if not stego_text:
+        return {"success": False, "error": "stego_text is required"}
+    return steg.decode_message(stego_text)
+
+
+def text_batch_response(process):
+    """Stream one NDJSON result line per item, echoing any item 'id'; bad items don't stop the batch."""
+    try:
+        items = text_batch_items()
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "Body must be a JSON array or NDJSON"
+        }), 400
+
+    def generate():
+        for index, item in enumerate(items):
+            line = {"index": index}
+            if isinstance(item, dict) and 'id' in item:
+                line["id"] = item['id']
+            try:
+                line.update(process(item))
+            except Exception as e:
+                line.update({"success": False, "error": f"Server error: {str(e)}"})
+            yield json.dumps(line) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/text/encode/batch', methods=['POST'])
+def encode_text_batch():
+    """Encode many {cover_text, secret_message} items, streaming back NDJSON"""
+    return text_batch_response(encode_text_item)
+
+
+@app.route('/api/text/decode/batch', methods=['POST'])
+def decode_text_batch():
+    """Decode many {stego_text} items, streaming back NDJSON"""
+    return text_batch_response(decode_text_item)
+
+
 """Audio Steganography API Routes"""
 
 # Initialize the audio steganography object
-audio_steg = AudioSteganography()
+# MP3_ENCODE_WORKERS > 1 opts in to parallel segment re-encoding of long MP3s
+audio_steg = AudioSteganography(encode_workers=int(os.environ.get("MP3_ENCODE_WORKERS", 1)))
 
 # Configure upload settings
 TEMP_OUTPUT_FOLDER = os.path.join(tempfile.gettempdir(), 'stego_outputs')
@@ -417,11 +814,15 @@ def check_audio_capacity():
         os.unlink(temp_path) # Clean up the temp file
 
         if capacity_info.get("status"):
-            return jsonify({
+            response = {
                 "success": True,
                 "file_format": ext.upper(),
                 "actual_max_characters": capacity_info.get("capacity")
-            }), 200
+            }
+            # Same unit field as the text capacity check; WAV capacity counts UTF-8 bytes
+            if "unit" in capacity_info:
+                response["unit"] = capacity_info["unit"]
+            return jsonify(response), 200
         else:
             return jsonify({"success": False, "error": "Failed to determine capacity."}), 500
 
@@ -0,0 +1,281 @@
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import image_kernels
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Colour types we can stream: 8-bit truecolour with and without alpha.
+CHANNELS_BY_COLOR_TYPE = {2: 3, 6: 4}
+COLOR_TYPE_BY_CHANNELS = {1: 0, 2: 4, 3: 2, 4: 6}
+
+# Uncompressed bytes per independently deflated block, and the window each
+# block is primed with so the split costs almost nothing in output size.
+DEFLATE_BLOCK_BYTES = 1024 * 1024
+DEFLATE_WINDOW = 32 * 1024
+
+# zlib releases the GIL while compressing, so threads give real parallelism. The pool
+# is created on first use; set_deflate_threads sizes it for processes sharing the CPUs.
+_deflate_pool = None
+_deflate_threads = os.cpu_count()
+_deflate_pool_lock = threading.Lock()
+
+# Filter types tried for every scanline: None, Sub, Up and Paeth.
+ROW_FILTERS = np.array([0, 1, 2, 4], dtype=np.uint8)
+
+# Rows filtered together; the filter temporaries are about 30x this size.
+FILTER_CHUNK_BYTES = 64 * 1024
+
+# Upper bound on the decompressed bytes produced per zlib call while streaming rows.
+INFLATE_CHUNK = 256 * 1024
+
+
+def _read_chunk(stream):
+    """Read one PNG chunk, returning (type, data) or (None, b'') at end of stream."""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None, b''
+    length, chunk_type = struct.unpack('>I4s', header)
+    data = stream.read(length)
+    stream.read(4)  # CRC
+    return chunk_type, data
+
+
+def unfilter_row(filter_type: int, row: bytes, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """Reverse the PNG filter of one scanline given the previous reconstructed one."""
+    if filter_type == 0:
+        return np.frombuffer(row, dtype=np.uint8)
+    if filter_type == 1:
+        # uint8 accumulation wraps modulo 256, exactly like the Sub predictor
+        return np.cumsum(np.frombuffer(row, dtype=np.uint8).reshape(-1, bpp), axis=0, dtype=np.uint8).ravel()
+    if filter_type == 2:
+        return np.frombuffer(row, dtype=np.uint8) + prev
+    if filter_type == 3:
+        return image_kernels.unfilter_average(row, prev, bpp)
+    if filter_type == 4:
+        return image_kernels.unfilter_paeth(row, prev, bpp)
+    raise ValueError(f"Invalid PNG filter type {filter_type}.")
+
+
+def open_png_rows(stream):
+    """Start streaming the scanlines of a PNG file.
+
+    Returns (width, height, channels, rows) where rows yields one (width, channels)
+    uint8 array per scanline, inflating and unfiltering only as rows are consumed.
+    Returns None (with the stream rewound) for anything other than a
+    non-interlaced 8-bit RGB or RGBA PNG; callers fall back to Pillow then.
+    """
+    start = stream.tell()
+    if stream.read(8) != PNG_SIGNATURE:
+        stream.seek(start)
+        return None
+
+    chunk_type, ihdr = _read_chunk(stream)
+    if chunk_type != b'IHDR':
+        stream.seek(start)
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', ihdr)
+    channels = CHANNELS_BY_COLOR_TYPE.get(color_type)
+    if bit_depth != 8 or channels is None or interlace:
+        stream.seek(start)
+        return None
+
+    def rows():
+        stride = width * channels
+        inflater = zlib.decompressobj()
+        pending = bytearray()
+        prev = np.zeros(stride, dtype=np.uint8)
+        produced = 0
+
+        while produced < height:
+            chunk_type, data = _read_chunk(stream)
+            if chunk_type is None or chunk_type == b'IEND':
+                return
+            if chunk_type != b'IDAT':
+                continue
+
+            while data and produced < height:
+                pending += inflater.decompress(data, INFLATE_CHUNK)
+                data = inflater.unconsumed_tail
+                while len(pending) > stride and produced < height:
+                    prev = unfilter_row(pending[0], bytes(pending[1:stride + 1]), prev, channels)
+                    del pending[:stride + 1]
+                    produced += 1
+                    yield prev.reshape(width, channels)
+
+    return width, height, channels, rows()
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + chunk_type + data
+            + struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+
+def set_deflate_threads(count: int) -> None:
+    """Set the number of threads write_png deflates with; takes effect before its first call."""
+    global _deflate_threads
+    _deflate_threads = max(1, count)
+
+
+def _get_deflate_pool() -> ThreadPoolExecutor:
+    global _deflate_pool
+    with _deflate_pool_lock:
+        if _deflate_pool is None:
+            _deflate_pool = ThreadPoolExecutor(max_workers=_deflate_threads)
+        return _deflate_pool
+
+
+def _filter_rows(rows: np.ndarray, prev: np.ndarray | None) -> bytes:
+    """Filter (n, width, channels) rows, returning the PNG scanlines.
+
+    Each row gets whichever of None, Sub, Up and Paeth leaves the smallest sum of
+    absolute (signed byte) differences, the heuristic libpng and Pillow use.
+    prev is the row above the first one, or None at the top of the image.
+    """
+    # A few rows at a time, since the candidates need several times the input in temporaries
+    step = max(1, FILTER_CHUNK_BYTES // max(1, rows[0].nbytes)) if len(rows) else 1
+    return b''.join(_filter_chunk(rows[start:start + step], rows[start - 1] if start else prev)
+                    for start in range(0, len(rows), step))
+
+
+def _filter_chunk(rows: np.ndarray, prev: np.ndarray | None) -> bytes:
+    height, width, channels = rows.shape
+    x = rows.reshape(height, -1)
+    above = np.empty_like(x)
+    above[0] = 0 if prev is None else prev.reshape(-1)
+    above[1:] = x[:-1]
+    left = np.zeros_like(x)
+    left[:, channels:] = x[:, :-channels]
+    upper_left = np.zeros_like(x)
+    upper_left[:, channels:] = above[:, :-channels]
+
+    a, b, c = left.astype(np.int16), above.astype(np.int16), upper_left.astype(np.int16)
+    pa, pb, pc = np.abs(b - c), np.abs(a - c), np.abs(a + b - 2 * c)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, above, upper_left))
+
+    candidates = np.stack([x, x - left, x - above, x - paeth])
+    scores = np.minimum(candidates, -candidates).sum(axis=2, dtype=np.int64)
+    choice = scores.argmin(axis=0)
+
+    out = np.empty((height, 1 + x.shape[1]), dtype=np.uint8)
+    out[:, 0] = ROW_FILTERS[choice]
+    out[:, 1:] = candidates[choice, np.arange(height)]
+    return out.tobytes()
+
+
+def _deflate_block(block: np.ndarray, history: np.ndarray, window_rows: int, level: int, last: bool):
+    """Filter and raw-deflate a block of rows, priming the compressor with the preceding window.
+
+    history holds the rows just above the block: window_rows of them plus the row
+    above those, or every row back to the top of the image if there are fewer.
+    """
+    raw = _filter_rows(block, history[-1] if len(history) else None)
+    window = b''
+    if len(history):
+        if len(history) > window_rows:
+            window = _filter_rows(history[1:], history[0])
+        else:
+            window = _filter_rows(history, None)
+        window = window[-DEFLATE_WINDOW:]
+
+    # Z_FILTERED, as Pillow and libpng use for filtered scanlines
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, zlib.Z_FILTERED, zdict=window)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(raw)
+
+
+def _write_png_blocks(width: int, height: int, channels: int, blocks, level: int) -> bytes:
+    """Encode a PNG from (n, width, channels) blocks of rows arriving top to bottom.
+
+    Blocks are deflated in parallel threads, with only a few in flight at a time;
+    each is flushed to a byte boundary so the pieces join into one valid zlib
+    stream, written as one IDAT chunk per block.
+    """
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, COLOR_TYPE_BY_CHANNELS[channels], 0, 0, 0)
+    stride = 1 + width * channels
+    window_rows = -(-DEFLATE_WINDOW // stride)
+
+    # zlib header: deflate with a 32K window, FLEVEL from the level, FCHECK making it a multiple of 31
+    flevel = 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+    cmf_flg = (0x78 << 8) | (flevel << 6)
+    zlib_header = (cmf_flg + 31 - cmf_flg % 31).to_bytes(2, 'big')
+
+    parts = [PNG_SIGNATURE, _chunk(b'IHDR', ihdr)]
+    adler = 1
+
+    def collect(future, rows):
+        nonlocal adler
+        data, block_adler = future.result()
+        # Combine the per-block Adler-32 sums; each is (b << 16) | a over its own bytes
+        length = rows * stride
+        a, b = adler & 0xFFFF, adler >> 16
+        block_a, block_b = block_adler & 0xFFFF, block_adler >> 16
+        b = (b + block_b + length * (a - 1)) % 65521
+        a = (a + block_a - 1) % 65521
+        adler = (b << 16) | a
+        parts.append(_chunk(b'IDAT', zlib_header + data if len(parts) == 2 else data))
+
+    pool = _get_deflate_pool()
+    pending = deque()
+    history = np.empty((0, width, channels), dtype=np.uint8)
+    done = 0
+    for block in blocks:
+        done += len(block)
+        pending.append((pool.submit(_deflate_block, block, history, window_rows, level, done == height),
+                        len(block)))
+        keep = window_rows + 1
+        history = (block[-keep:] if len(block) >= keep
+                   else np.concatenate([history, block])[-keep:]).copy()
+        while len(pending) > _deflate_threads:
+            collect(*pending.popleft())
+    while pending:
+        collect(*pending.popleft())
+    if done != height:
+        raise ValueError(f"PNG has {done} rows of the {height} its header declares.")
+
+    parts.append(_chunk(b'IDAT', struct.pack('>I', adler)))
+    parts.append(_chunk(b'IEND', b''))
+    return b''.join(parts)
+
+
+def write_png(pixels: np.ndarray, level: int = 6) -> bytes:
+    """Encode an (height, width, channels) uint8 array as a PNG.
+
+    Scanlines are filtered row by row and deflated in parallel blocks.
+    """
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    height, width, channels = pixels.shape
+    block_rows = max(1, DEFLATE_BLOCK_BYTES // (1 + width * channels))
+    blocks = (pixels[start:start + block_rows] for start in range(0, height, block_rows))
+    return _write_png_blocks(width, height, channels, blocks, level)
+
+
+def write_png_rows(width: int, height: int, channels: int, rows, level: int = 6) -> bytes:
+    """Encode a PNG from an iterable of (width, channels) uint8 rows, such as open_png_rows yields.
+
+    Rows are gathered a block at a time, so apart from the output only the
+    blocks waiting to be deflated are held in memory.
+    """
+    block_rows = max(1, DEFLATE_BLOCK_BYTES // (1 + width * channels))
+
+    def blocks():
+        block = np.empty((block_rows, width, channels), dtype=np.uint8)
+        count = 0
+        for row in rows:
+            block[count] = row
+            count += 1
+            if count == block_rows:
+                yield block
+                block = np.empty_like(block)
+                count = 0
+        if count:
+            yield block[:count]
+
+    return _write_png_blocks(width, height, channels, blocks(), level)